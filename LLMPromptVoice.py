@@ -1,47 +1,60 @@
-from google import genai
-from google.genai import types
-import pyttsx3
-
-# Set up your Gemini API key
-GEMINI_API_KEY = "API-KEY" 
-
-# Initialize the Google Gen AI client
-client = genai.Client(api_key=GEMINI_API_KEY)
-
-def get_ai_response(prompt):
-    """Gets response from the Gemini 1.5 model."""
-    try:
-        response = client.models.generate_content(
-            model='gemini-1.5-flash',
-            contents=prompt
-        )
-        answer = response.text
-        print(f"AI Response: {answer}")
-        return answer
-    except Exception as e:
-        print(f"Error fetching AI response: {e}")
-        return "I'm sorry, I couldn't process that."
-
-def speak_response(response):
-    """Converts text to speech and plays it back."""
-    engine = pyttsx3.init()
-    engine.say(response)
-    engine.runAndWait()
-
-if __name__ == "__main__":
-    print("Welcome to the AI Text Prompt Chatbot with Prompt Engineering!")
-    print("Type your prompt below and press Enter to get a response.")
-    while True:
-        user_input = input("Your Prompt: ")
-
-        if user_input.lower() in ["exit", "quit", "stop"]:
-            print("Goodbye!")
-            break
-
-        print("Fetching response...\n")
-
-        # Get response from Gemini API
-        ai_response = get_ai_response(user_input)
-
-        # Speak the response
-        speak_response(ai_response)
+from speech_stream import StreamTimer, stream_to_speech
+from tts_worker import get_tts_worker
+from llm_gateway import LlmGateway, GeminiProvider
+from response_cache import get_response_cache
+
+# Set up your Gemini API key
+GEMINI_API_KEY = "API-KEY" 
+
+# Route Gemini calls through the shared gateway (one pooled client, retries, timeouts)
+gateway = LlmGateway([GeminiProvider(GEMINI_API_KEY, model='gemini-1.5-flash')])
+
+# Responses to prompts seen before (see response_cache.py)
+CACHE_CONFIG = {"model": "gemini-1.5-flash"}
+response_cache = get_response_cache()
+
+def get_ai_response(prompt):
+    """Gets response from the Gemini 1.5 model."""
+    try:
+        answer = response_cache.get_or_compute(prompt, lambda: gateway.complete_sync(prompt).text, config=CACHE_CONFIG)
+        print(f"AI Response: {answer}")
+        return answer
+    except Exception as e:
+        print(f"Error fetching AI response: {e}")
+        return "I'm sorry, I couldn't process that."
+
+def get_ai_response_stream(prompt):
+    """Streams the Gemini 1.5 response as text chunks as they are generated."""
+    try:
+        # A repeated prompt is answered from the cache in one chunk
+        for chunk in response_cache.cached_stream(prompt, lambda: gateway.stream_sync(prompt), config=CACHE_CONFIG):
+            yield chunk
+    except Exception as e:
+        print(f"Error fetching AI response: {e}")
+        yield "I'm sorry, I couldn't process that."
+
+def speak_response(response):
+    """Converts text to speech and plays it back on the shared TTS worker."""
+    get_tts_worker().speak(response)
+
+if __name__ == "__main__":
+    print("Welcome to the AI Text Prompt Chatbot with Prompt Engineering!")
+    print("Type your prompt below and press Enter to get a response.")
+    while True:
+        user_input = input("Your Prompt: ")
+
+        if user_input.lower() in ["exit", "quit", "stop"]:
+            print("Goodbye!")
+            break
+
+        print("Fetching response...\n")
+
+        # Stream the response from Gemini API and speak each sentence as it completes
+        timer = StreamTimer()
+        ai_response = stream_to_speech(
+            get_ai_response_stream(user_input),
+            speak_response,
+            on_sentence=lambda sentence, _: print(f"AI: {sentence}"),
+            timer=timer
+        )
+        print(f"Latency: {timer.summary()}")
@@ -1,67 +1,90 @@
-from google import genai
-from google.genai import types
-import pyttsx3
-import speech_recognition as sr
-
-# Set up your Gemini API key
-GEMINI_API_KEY = "API-KEY"
-
-# Initialize the Google Gen AI client
-client = genai.Client(api_key=GEMINI_API_KEY)
-
-def listen_to_user():
-    """Uses microphone to capture speech and convert it to text."""
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("Listening for your question...")
-        try:
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=10)
-            text = recognizer.recognize_google(audio)
-            print(f"You said: {text}")
-            return text
-        except sr.UnknownValueError:
-            print("Sorry, I didn't catch that.")
-            return None
-        except sr.RequestError as e:
-            print(f"Speech recognition error: {e}")
-            return None
-
-def get_ai_response(prompt):
-    """Gets response from the Gemini 1.5 model."""
-    try:
-        response = client.models.generate_content(
-            model='gemini-1.5-flash',
-            contents=prompt
-        )
-        answer = response.text
-        print(f"AI Response: {answer}")
-        return answer
-    except Exception as e:
-        print(f"Error fetching AI response: {e}")
-        return "I'm sorry, I couldn't process that."
-
-def speak_response(response):
-    """Converts text to speech and plays it back."""
-    engine = pyttsx3.init()
-    engine.say(response)
-    engine.runAndWait()
-
-if __name__ == "__main__":
-    print("Welcome to the AI Voice Chatbot!")
-    print("Please ask your question after the prompt.")
-    while True:
-        user_input = listen_to_user()
-        if user_input is None:
-            print("Let's try again.")
-            continue
-
-        print(f"Your Question: {user_input}")
-
-        if user_input.lower() in ["exit", "quit", "stop"]:
-            print("Goodbye!")
-            break
-
-        ai_response = get_ai_response(user_input)
-        print(f"AI's Response: {ai_response}")
-        speak_response(ai_response)
-
+import os
+import sys
+import speech_recognition as sr
+
+# Shared helpers live in the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from speech_stream import StreamTimer, stream_to_speech
+from tts_worker import get_tts_worker
+from asr_backends import get_recognizer
+from vad import listen_for_speech
+from llm_gateway import LlmGateway, GeminiProvider
+from response_cache import get_response_cache
+
+# Set up your Gemini API key
+GEMINI_API_KEY = "API-KEY"
+
+# Route Gemini calls through the shared gateway (one pooled client, retries, timeouts)
+gateway = LlmGateway([GeminiProvider(GEMINI_API_KEY, model='gemini-1.5-flash')])
+
+# Responses to prompts seen before (see response_cache.py)
+CACHE_CONFIG = {"model": "gemini-1.5-flash"}
+response_cache = get_response_cache()
+
+def listen_to_user():
+    """Uses microphone to capture speech and convert it to text."""
+    with sr.Microphone() as source:
+        print("Listening for your question...")
+        try:
+            # Starts at speech onset and stops after a short silence
+            audio = listen_for_speech(source, no_speech_timeout=5, max_speech=10)
+            text = get_recognizer().transcribe(audio)
+            print(f"You said: {text}")
+            return text
+        except sr.UnknownValueError:
+            print("Sorry, I didn't catch that.")
+            return None
+        except sr.RequestError as e:
+            print(f"Speech recognition error: {e}")
+            return None
+
+def get_ai_response(prompt):
+    """Gets response from the Gemini 1.5 model."""
+    try:
+        answer = response_cache.get_or_compute(prompt, lambda: gateway.complete_sync(prompt).text, config=CACHE_CONFIG)
+        print(f"AI Response: {answer}")
+        return answer
+    except Exception as e:
+        print(f"Error fetching AI response: {e}")
+        return "I'm sorry, I couldn't process that."
+
+def get_ai_response_stream(prompt):
+    """Streams the Gemini 1.5 response as text chunks as they are generated."""
+    try:
+        # A repeated prompt is answered from the cache in one chunk
+        for chunk in response_cache.cached_stream(prompt, lambda: gateway.stream_sync(prompt), config=CACHE_CONFIG):
+            yield chunk
+    except Exception as e:
+        print(f"Error fetching AI response: {e}")
+        yield "I'm sorry, I couldn't process that."
+
+def speak_response(response):
+    """Converts text to speech and plays it back on the shared TTS worker."""
+    get_tts_worker().speak(response)
+
+if __name__ == "__main__":
+    print("Welcome to the AI Voice Chatbot!")
+    print("Please ask your question after the prompt.")
+    while True:
+        user_input = listen_to_user()
+        if user_input is None:
+            print("Let's try again.")
+            continue
+
+        print(f"Your Question: {user_input}")
+
+        if user_input.lower() in ["exit", "quit", "stop"]:
+            print("Goodbye!")
+            break
+
+        timer = StreamTimer()
+        ai_response = stream_to_speech(
+            get_ai_response_stream(user_input),
+            speak_response,
+            on_sentence=lambda sentence, _: print(f"AI: {sentence}"),
+            timer=timer
+        )
+        print(f"Latency: {timer.summary()}")
+
@@ -1,71 +1,72 @@
-import assemblyai as aai
-import openai
-import elevenlabs
-from queue import Queue
-
-# Set API keys
-aai.settings.api_key = "API-KEY"
-openai.api_key = "API-KEY"
-elevenlabs.api_key="API-KEY"
-
-transcript_queue = Queue()
-
-def on_data(transcript: aai.RealtimeTranscript):
-    if not transcript.text:
-        return
-    if isinstance(transcript, aai.RealtimeFinalTranscript):
-        transcript_queue.put(transcript.text + '')
-        print("User:", transcript.text, end="\r\n")
-    else:
-        print(transcript.text, end="\r")
-
-def on_error(error: aai.RealtimeError):
-    print("An error occured:", error)
-
-# Conversation loop
-def handle_conversation():
-    while True:
-        transcriber = aai.RealtimeTranscriber(
-            on_data=on_data,
-            on_error=on_error,
-            sample_rate=44_100,
-        )
-
-        # Start the connection
-        transcriber.connect()
-
-        # Open  the microphone stream
-        microphone_stream = aai.extras.MicrophoneStream()
-
-        # Stream audio from the microphone
-        transcriber.stream(microphone_stream)
-
-        # Close current transcription session with Crtl + C
-        transcriber.close()
-
-        # Retrieve data from queue
-        transcript_result = transcript_queue.get()
-
-        # Send the transcript to OpenAI for response generation
-        response = openai.ChatCompletion.create(
-            model = 'gpt-4',
-            messages = [
-                {"role": "system", "content": 'You are a highly skilled AI, answer the questions given within a maximum of 1000 characters.'},
-                {"role": "user", "content": transcript_result}
-            ]
-        )
-
-        #text = response['choices'][0]['message']['content']
-        text = "AssemblyAI is the best YouTube channel for the latest AI tutorials."
-
-        # Convert the response to audio and play it
-        audio = elevenlabs.generate(
-            text=text,
-            voice="Bella" # or any voice of your choice
-        )
-
-        print("\nAI:", text, end="\r\n")
-
-        elevenlabs.play(audio)
-
-handle_conversation()
\ No newline at end of file
+import os
+import sys
+import assemblyai as aai
+import elevenlabs
+
+# Shared helpers live in the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from live_analysis import StreamingSentimentAnalyzer
+from llm_gateway import LlmGateway, OpenAIProvider
+from realtime_transcriber import RealtimeSession
+
+# Set API keys
+aai.settings.api_key = "API-KEY"
+OPENAI_API_KEY = "API-KEY"
+elevenlabs.api_key="API-KEY"
+
+# Microphone sample rate for the realtime transcription session
+SAMPLE_RATE = 44_100
+
+# OpenAI client created once and reused for every turn
+gateway = LlmGateway([OpenAIProvider(OPENAI_API_KEY, model='gpt-4')])
+
+# Rolling sentiment, updated from partial transcripts while the user is speaking
+live_sentiment = StreamingSentimentAnalyzer()
+
+def on_partial(text):
+    print(f"[{live_sentiment.update(text)}]", text, end="\r")
+
+def on_final(text):
+    print(f"User ({live_sentiment.update(text)}):", text, end="\r\n")
+
+# Conversation loop
+def handle_conversation():
+    # One microphone stream and one transcription session for the whole conversation;
+    # a turn ends once the user has been silent for a moment after a final transcript
+    microphone_stream = aai.extras.MicrophoneStream(sample_rate=SAMPLE_RATE)
+    with RealtimeSession(aai.settings.api_key, microphone_stream, sample_rate=SAMPLE_RATE,
+                         on_partial=on_partial, on_final=on_final) as session:
+        while True:
+            turn = session.next_turn()
+            live_sentiment.reset()  # Start fresh for the next turn
+
+            # Send the transcript to OpenAI for response generation
+            response = gateway.complete_sync(
+                turn.text,
+                system='You are a highly skilled AI, answer the questions given within a maximum of 1000 characters.'
+            )
+            turn.mark("llm")
+
+            #text = response.text
+            text = "AssemblyAI is the best YouTube channel for the latest AI tutorials."
+
+            # Convert the response to audio and play it
+            audio = elevenlabs.generate(
+                text=text,
+                voice="Bella" # or any voice of your choice
+            )
+            turn.mark("tts")
+
+            print("\nAI:", text, end="\r\n")
+
+            # Don't transcribe our own reply; the session stays connected meanwhile
+            with session.muted():
+                elevenlabs.play(audio)
+            turn.mark("played")
+
+            session.finish_turn(turn)
+            print(f"Turn latency: {turn.summary()}")
+
+handle_conversation()
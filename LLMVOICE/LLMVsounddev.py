@@ -1,124 +1,122 @@
-import sounddevice as sd
-import numpy as np
-import speech_recognition as sr
-from scipy.io.wavfile import write
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
-import pyttsx3
-import os
-
-def get_audio_input():
-    """
-    Captures audio using `sounddevice`, saves it temporarily, and converts it to text using `speech_recognition`.
-    """
-    print("Listening...")
-    fs = 44100  # Sample rate
-    duration = 5  # Duration of recording in seconds
-    recognizer = sr.Recognizer()
-
-    try:
-        # Record audio
-        print("Recording for 5 seconds...")
-        audio_data = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype="int16")
-        sd.wait()  # Wait for recording to finish
-        print("Recording complete.")
-
-        # Save the recording temporarily
-        temp_wav_path = "temp_audio.wav"
-        write(temp_wav_path, fs, audio_data)
-
-        # Use speech_recognition to process the WAV file
-        with sr.AudioFile(temp_wav_path) as source:
-            audio = recognizer.record(source)
-            text = recognizer.recognize_google(audio)
-            print(f"You said: {text}")
-            return text
-    except Exception as e:
-        print(f"Error: {e}")
-        return None
-    finally:
-        # Clean up temporary file
-        if os.path.exists("temp_audio.wav"):
-            os.remove("temp_audio.wav")
-
-def load_gpt2():
-    """
-    Loads the GPT-2 model and tokenizer on GPU if available, otherwise CPU.
-    """
-    print("Loading GPT-2 model...")
-    
-    # Check if GPU is available
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Using device: {device}")
-
-    model_name = "gpt2"  # GPT-2 model name
-    
-    # Load tokenizer
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    
-    # Load the model explicitly and move it to the selected device (GPU or CPU)
-    model = AutoModelForCausalLM.from_pretrained(model_name).to(device)
-    
-    print("Model loaded successfully.")
-    return model, tokenizer, device
-
-def get_response(model, tokenizer, device, user_input):
-    """
-    Generates a response using GPT-2 for the given user input.
-    """
-    # Create a structured prompt
-    prompt = (
-        "You are an assistant that answers questions concisely.\n"
-        "Q: What is your name?\n"
-        "A: My name is GPT-2.\n"
-        f"Q: {user_input}\n"
-        "A:"
-    )
-
-    # Tokenize input
-    inputs = tokenizer(prompt, return_tensors="pt").to(device)  # Move input tensors to the correct device
-
-    # Generate response with constraints to avoid unnecessary continuation
-    outputs = model.generate(
-        inputs.input_ids, 
-        max_length=50,  # Limit the length of the output
-        num_return_sequences=1, 
-        no_repeat_ngram_size=2,  # Prevent repetition
-        do_sample=False,  # Greedy decoding (no randomness)
-        temperature=0.7,  # Less randomness for focused responses
-        top_p=0.9,  # Use nucleus sampling for better output
-        top_k=50  # Limit the sampling pool for better quality responses
-    )
-
-    # Decode the generated response
-    response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    # Extract only the generated answer part (after the "A:")
-    if "A:" in response:
-        response = response.split("A:")[1].strip()
-    
-    return response
-
-def speak_text(text):
-    """
-    Converts text to speech using pyttsx3 for offline TTS.
-    """
-    engine = pyttsx3.init()
-    engine.say(text)
-    engine.runAndWait()
-
-if __name__ == "__main__":
-    # Load GPT-2 model
-    model, tokenizer, device = load_gpt2()
-
-    while True:
-        # Step 1: Get Audio Input
-        user_input = get_audio_input()
-        if user_input:
-            # Step 2: Generate Response
-            print("Generating response...")
-            response = get_response(model, tokenizer, device, user_input)
-            print(f"GPT-2 says: {response}")
-
-            # Step 3: Convert Response to Speech
-            speak_text(response)
+import numpy as np
+from transformers import AutoTokenizer, AutoModelForCausalLM
+import torch
+import os
+import sys
+
+# Shared helpers live in the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from tts_worker import get_tts_worker
+from asr_backends import get_recognizer
+from vad import record_speech
+from model_server import connect_model_server
+from gpt2_engine import Gpt2Engine, DecodingConfig, QA_PREFIX, QA_STOP, qa_suffix
+
+def get_audio_input():
+    """
+    Captures audio using `sounddevice` and converts it to text straight from memory (no temporary WAV file).
+    Recording starts when the user starts speaking and stops after a short silence.
+    """
+    print("Listening...")
+    fs = 44100  # Sample rate
+
+    try:
+        # Record one utterance, trimmed to the voiced audio
+        audio = record_speech(fs, trailing_silence=0.7, no_speech_timeout=5, max_speech=15)
+        if audio is None:
+            print("No speech detected.")
+            return None
+        print(f"Recording complete ({audio.duration:.1f}s of speech).")
+
+        # Hand the recording to the speech recognizer
+        text = get_recognizer().transcribe(audio)
+        print(f"You said: {text}")
+        return text
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+def load_gpt2():
+    """
+    Loads the GPT-2 model and tokenizer on GPU if available, otherwise CPU.
+    """
+    print("Loading GPT-2 model...")
+    
+    # Check if GPU is available
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print(f"Using device: {device}")
+
+    model_name = "gpt2"  # GPT-2 model name
+    
+    # Load tokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    
+    # Load the model explicitly and move it to the selected device (GPU or CPU)
+    model = AutoModelForCausalLM.from_pretrained(model_name).to(device)
+    
+    print("Model loaded successfully.")
+    return model, tokenizer, device
+
+def build_prompt(user_input):
+    """
+    Builds the few-shot prompt GPT-2 completes.
+    """
+    return QA_PREFIX + qa_suffix(user_input)
+
+# Decoding settings, shared by the local engine and the model server.
+# LLM_DECODING picks greedy (default), beam or sample; the answer ends at the next "Q:".
+DECODING = DecodingConfig(
+    os.environ.get("LLM_DECODING", "greedy"),
+    max_new_tokens=40,  # Budget for the answer alone, however long the question is
+    no_repeat_ngram_size=2,  # Prevent repetition
+    stop=QA_STOP,
+)
+
+def load_engine(model, tokenizer, device):
+    """
+    Wraps the loaded GPT-2 in a generation engine that encodes the few-shot preamble once.
+    """
+    return Gpt2Engine(model=model, tokenizer=tokenizer, device=device, prefix=QA_PREFIX, decoding=DECODING)
+
+def get_response(engine, user_input):
+    """
+    Generates a response using GPT-2 for the given user input.
+    Only the question is encoded; the preamble's keys/values are reused from the engine,
+    and only the newly generated answer is returned.
+    """
+    return engine.generate(qa_suffix(user_input))["text"].strip()
+
+def get_server_response(client, user_input):
+    """
+    Generates a response with the GPT-2 already loaded in the shared model server.
+    """
+    return client.generate(build_prompt(user_input), model="gpt2", decoding=DECODING)["text"].strip()
+
+def speak_text(text):
+    """
+    Converts text to speech using the shared pyttsx3 worker for offline TTS.
+    """
+    get_tts_worker().speak(text)
+
+if __name__ == "__main__":
+    # Reuse GPT-2 from the shared model server if one is running, otherwise load it here
+    model_client = connect_model_server()
+    if model_client is None:
+        engine = load_engine(*load_gpt2())
+
+    while True:
+        # Step 1: Get Audio Input
+        user_input = get_audio_input()
+        if user_input:
+            # Step 2: Generate Response
+            print("Generating response...")
+            if model_client is not None:
+                response = get_server_response(model_client, user_input)
+            else:
+                response = get_response(engine, user_input)
+            print(f"GPT-2 says: {response}")
+
+            # Step 3: Convert Response to Speech
+            speak_text(response)
@@ -1,34 +1,74 @@
-import torch
-from transformers import GPT2Tokenizer, GPT2LMHeadModel
-
-# Load tokenizer and model
-tokenizer = GPT2Tokenizer.from_pretrained('gpt2-medium')
-model = GPT2LMHeadModel.from_pretrained('gpt2-medium')
-
-# Set the pad_token explicitly to eos_token
-tokenizer.pad_token = tokenizer.eos_token  # Set pad token to eos token
-model.config.pad_token_id = tokenizer.pad_token_id  # Ensure model uses the pad token
-
-# Prepare input with attention mask
-sentence = 'Today is a good day'
-inputs = tokenizer(sentence, return_tensors='pt', padding=True, truncation=True)
-
-# Move input to GPU if available
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-model = model.to(device)
-inputs = {key: val.to(device) for key, val in inputs.items()}  # Move all inputs to device
-
-# Generate text with attention mask
-result = model.generate(
-    inputs['input_ids'],
-    attention_mask=inputs['attention_mask'],  # Explicit attention mask
-    max_length=50,
-    num_beams=2,
-    no_repeat_ngram_size=2,
-    early_stopping=True
-)
-
-# Decode and print result
-generated_text = tokenizer.decode(result[0], skip_special_tokens=True)
-print(generated_text)
-
+import os
+import sys
+import torch
+from transformers import GPT2Tokenizer, GPT2LMHeadModel
+from model_server import connect_model_server
+from gpt2_engine import Gpt2Engine, DecodingConfig, run_prompt_file
+from cpu_inference import load_cpu_model
+
+# Decoding settings, shared by the local model and the model server
+# (45 new tokens on top of the 5-token sentence matches the old max_length=50)
+DECODING = DecodingConfig('beam', max_new_tokens=45, num_beams=2, no_repeat_ngram_size=2)
+
+# CPU inference mode when there is no GPU: fp32, int8 (default), compile or onnx
+CPU_MODE = os.environ.get('LLM_CPU_MODE', 'int8')
+
+def load_model(model_name='gpt2-medium'):
+    """Load the model on the GPU if available, otherwise in the configured CPU mode."""
+    if not torch.cuda.is_available():
+        return load_cpu_model(model_name, CPU_MODE)
+
+    # Load tokenizer and model
+    tokenizer = GPT2Tokenizer.from_pretrained(model_name)
+    model = GPT2LMHeadModel.from_pretrained(model_name)
+
+    # Set the pad_token explicitly to eos_token
+    tokenizer.pad_token = tokenizer.eos_token  # Set pad token to eos token
+    model.config.pad_token_id = tokenizer.pad_token_id  # Ensure model uses the pad token
+    return model, tokenizer
+
+def generate_locally(sentence):
+    model, tokenizer = load_model()
+
+    # Prepare input with attention mask
+    inputs = tokenizer(sentence, return_tensors='pt', padding=True, truncation=True)
+
+    # Move input to GPU if available
+    if torch.cuda.is_available():
+        device = torch.device("cuda")
+        model = model.to(device)
+        inputs = {key: val.to(device) for key, val in inputs.items()}  # Move all inputs to device
+
+    # Generate text with attention mask
+    result = model.generate(
+        inputs['input_ids'],
+        attention_mask=inputs['attention_mask'],  # Explicit attention mask
+        **DECODING.generate_kwargs()
+    )
+
+    # Decode the result
+    return tokenizer.decode(result[0], skip_special_tokens=True)
+
+# Usage: python LLMtextgenfinal.py [prompts.txt]
+# With a prompts file, every line is continued in dynamic batches and tokens/sec and p50/p99 latency are reported
+if len(sys.argv) > 1:
+    if CPU_MODE == 'onnx' and not torch.cuda.is_available():
+        sys.exit("The batching engine needs a PyTorch model; set LLM_CPU_MODE to fp32, int8 or compile.")
+    model, tokenizer = load_model()
+    # Batches decode greedily; beam search would run the prompts one at a time
+    engine = Gpt2Engine(model=model, tokenizer=tokenizer,
+                        decoding=DecodingConfig('greedy', max_new_tokens=40, no_repeat_ngram_size=2))
+    run_prompt_file(sys.argv[1], engine)
+    sys.exit(0)
+
+sentence = 'Today is a good day'
+
+# Use the warm gpt2-medium in the shared model server if one is running (python model_server.py)
+model_client = connect_model_server()
+if model_client is not None:
+    generated_text = sentence + model_client.generate(sentence, model='gpt2-medium', decoding=DECODING)["text"]
+else:
+    generated_text = generate_locally(sentence)
+
+# Print result
+print(generated_text)
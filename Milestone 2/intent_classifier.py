@@ -0,0 +1,223 @@
+import os
+import re
+import sys
+import csv
+import time
+import threading
+from collections import OrderedDict
+
+# Intent labels the classifier chooses between
+INTENT_CANDIDATES = ["Complaint", "Product Inquiry", "Feedback", "Purchase Intent", "Other"]
+
+# NLI models usable for zero-shot classification. "default" is what
+# pipeline("zero-shot-classification") loads; the distilled ones are much faster on CPU.
+MODELS = {
+    "default": "facebook/bart-large-mnli",
+    "distilbart": "valhalla/distilbart-mnli-12-3",
+    "small": "valhalla/distilbart-mnli-12-1",
+    "distilbert": "typeform/distilbert-base-uncased-mnli",
+}
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+
+class ZeroShotIntentClassifier:
+    """Zero-shot intent classification over NLI, batched and memoized.
+
+    Same scoring as pipeline("zero-shot-classification") with a single label
+    per text: every (text, "This example is {label}.") pair goes through the
+    NLI model and the entailment logits are softmaxed across the labels. The
+    difference is in the plumbing:
+
+    - the hypothesis for every label is tokenized once, up front;
+    - `classify_batch` packs all text/label pairs of many texts into a few
+      padded forward passes (texts sorted by length to keep padding low);
+    - results are kept in an LRU cache keyed by the normalized text, so a
+      repeated utterance ("yes", "thank you") is never run twice.
+    """
+
+    def __init__(self, model_name=None, labels=None, hypothesis_template="This example is {}.",
+                 batch_size=32, cache_size=10000, device="cpu"):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+        model_name = model_name or os.environ.get("INTENT_MODEL", "default")
+        self.model_name = MODELS.get(model_name, model_name)
+        self.labels = list(labels or INTENT_CANDIDATES)
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.device = device
+        self._torch = torch
+
+        start = time.perf_counter()
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name).to(device).eval()
+        self.load_time = time.perf_counter() - start
+
+        self.entailment_id = self._label_id("entailment")
+        self.max_length = min(self.tokenizer.model_max_length, 512)
+        self._pad_id = self.tokenizer.pad_token_id or 0
+
+        # Hypothesis encodings are fixed for the life of the classifier
+        self._hypotheses = [
+            self.tokenizer(hypothesis_template.format(label), add_special_tokens=False)["input_ids"]
+            for label in self.labels
+        ]
+        self._special_tokens = self.tokenizer.num_special_tokens_to_add(pair=True)
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _label_id(self, name):
+        for label, index in self.model.config.label2id.items():
+            if label.lower().startswith(name):
+                return index
+        raise ValueError(f"{self.model_name} has no '{name}' label; is it an NLI model?")
+
+    def classify(self, text):
+        """Return (intent, score) for one text."""
+        return self.classify_batch([text])[0]
+
+    def classify_batch(self, texts):
+        """Return (intent, score) for every text, in order."""
+        results = [None] * len(texts)
+        pending = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = _normalize(text)
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[i] = self._cache[key]
+                    self.hits += 1
+                else:
+                    # Duplicates within the batch are only classified once
+                    pending.setdefault(key, []).append(i)
+                    self.misses += 1
+
+        keys = sorted(pending, key=len)
+        for start in range(0, len(keys), self.batch_size):
+            chunk = keys[start:start + self.batch_size]
+            for key, result in zip(chunk, self._score(chunk)):
+                for i in pending[key]:
+                    results[i] = result
+                self._remember(key, result)
+        return results
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _encode(self, texts):
+        """Build padded input tensors for every (text, hypothesis) pair."""
+        rows = []
+        for text in texts:
+            premise = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+            for hypothesis in self._hypotheses:
+                room = self.max_length - len(hypothesis) - self._special_tokens
+                ids = self.tokenizer.build_inputs_with_special_tokens(premise[:room], hypothesis)
+                rows.append(ids)
+
+        width = max(len(ids) for ids in rows)
+        input_ids = [ids + [self._pad_id] * (width - len(ids)) for ids in rows]
+        attention = [[1] * len(ids) + [0] * (width - len(ids)) for ids in rows]
+        torch = self._torch
+        return {
+            "input_ids": torch.tensor(input_ids, device=self.device),
+            "attention_mask": torch.tensor(attention, device=self.device),
+        }
+
+    def _score(self, texts):
+        torch = self._torch
+        with torch.inference_mode():
+            logits = self.model(**self._encode(texts)).logits
+        entailment = logits[:, self.entailment_id].view(len(texts), len(self.labels))
+        probabilities = entailment.softmax(dim=1).cpu().tolist()
+
+        results = []
+        for row in probabilities:
+            best = max(range(len(row)), key=row.__getitem__)
+            results.append((self.labels[best], row[best]))
+        return results
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_classifiers = {}
+_classifiers_lock = threading.Lock()
+
+
+def get_intent_classifier(model_name=None, **options):
+    """Return a shared classifier for `model_name` and `options`, loading it on first use."""
+    model_name = model_name or os.environ.get("INTENT_MODEL", "default")
+    key = (model_name, tuple(sorted(options.items())))
+    with _classifiers_lock:
+        if key not in _classifiers:
+            _classifiers[key] = ZeroShotIntentClassifier(model_name, **options)
+        return _classifiers[key]
+
+
+def read_transcripts(path):
+    """Read transcripts from a .txt file (one per line) or a .csv with a text/transcript column."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            column = next((name for name in reader.fieldnames or [] if name.lower() in ("text", "transcript", "transcription")), None)
+            if column is None:
+                raise ValueError(f"{path} needs a 'text' or 'transcript' column")
+            return [row[column] for row in reader if row[column].strip()]
+        return [line.strip() for line in f if line.strip()]
+
+
+def classify_archive(input_path, output_path, model_name=None, batch_size=32):
+    """Classify every transcript in `input_path` and write text,intent,score rows to a CSV."""
+    texts = read_transcripts(input_path)
+    classifier = get_intent_classifier(model_name, batch_size=batch_size)
+    print(f"Loaded {classifier.model_name} in {classifier.load_time:.1f}s; classifying {len(texts)} transcripts")
+
+    start = time.perf_counter()
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["text", "intent", "score"])
+        # Work through the archive in slices so progress is visible and memory stays flat
+        step = batch_size * 20
+        for offset in range(0, len(texts), step):
+            chunk = texts[offset:offset + step]
+            for text, (intent, score) in zip(chunk, classifier.classify_batch(chunk)):
+                writer.writerow([text, intent, f"{score:.4f}"])
+            done = offset + len(chunk)
+            elapsed = time.perf_counter() - start
+            print(f"{done}/{len(texts)} transcripts, {done / elapsed:.1f}/s")
+
+    elapsed = time.perf_counter() - start
+    stats = classifier.stats()
+    print(f"Done in {elapsed:.1f}s ({len(texts) / elapsed:.1f} transcripts/s), "
+          f"cache hit rate {stats['hit_rate']:.0%}")
+
+
+if __name__ == "__main__":
+    # Usage: python intent_classifier.py transcripts.(txt|csv) [output.csv] [model] [batch_size]
+    # model is one of default, distilbart, small, distilbert, or any Hugging Face NLI model name
+    if len(sys.argv) < 2:
+        print("Usage: python intent_classifier.py transcripts.(txt|csv) [output.csv] [model] [batch_size]")
+        sys.exit(1)
+    classify_archive(
+        sys.argv[1],
+        sys.argv[2] if len(sys.argv) > 2 else "intents.csv",
+        sys.argv[3] if len(sys.argv) > 3 else None,
+        int(sys.argv[4]) if len(sys.argv) > 4 else 32,
+    )
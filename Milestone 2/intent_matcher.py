@@ -0,0 +1,116 @@
+import re
+import sys
+import time
+import random
+
+
+class IntentMatcher:
+    """Keyword intent matcher that scans the text once.
+
+    `intents` maps each intent to its keywords; the order of the mapping is the
+    priority (first = highest). The text is split into words once and every
+    word n-gram is looked up in a precompiled keyword table, so keywords only
+    match whole words ("hi" no longer matches "this", "who" no longer matches
+    "whole") and the cost doesn't grow with the number of keywords.
+
+    Contractions are split ("what's" -> "what", "s") and words are compared by
+    a light stem, so inflected forms match too ("complained" -> "complain").
+    """
+
+    WORD = re.compile(r"[a-z0-9]+")
+    SUFFIXES = ("ing", "ed", "es", "s")
+
+    @classmethod
+    def stem(cls, word):
+        """Strip one common inflection and a final "e", keeping at least three letters."""
+        for suffix in cls.SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                word = word[:-len(suffix)]
+                break
+        if word.endswith("e") and len(word) > 3:
+            word = word[:-1]
+        return word
+
+    def _words(self, text):
+        return [self.stem(word) for word in self.WORD.findall(text.lower())]
+
+    def __init__(self, intents):
+        self.priorities = {intent: rank for rank, intent in enumerate(intents)}
+        self._intents_for = {}
+        for intent, keywords in intents.items():
+            for keyword in keywords:
+                key = tuple(self._words(keyword))
+                if key:
+                    self._intents_for.setdefault(key, []).append(intent)
+        self._max_words = max((len(key) for key in self._intents_for), default=0)
+
+    def match(self, text):
+        """Return every matching intent as (intent, priority, keywords), highest priority first."""
+        words = self._words(text)
+        table = self._intents_for
+        found = {}
+        for start in range(len(words)):
+            for length in range(1, min(self._max_words, len(words) - start) + 1):
+                key = tuple(words[start:start + length])
+                intents = table.get(key)
+                if intents:
+                    for intent in intents:
+                        found.setdefault(intent, []).append(" ".join(words[start:start + length]))
+        return sorted(
+            ((intent, self.priorities[intent], keywords) for intent, keywords in found.items()),
+            key=lambda item: item[1]
+        )
+
+    def best(self, text):
+        """Return the highest-priority matching intent, or None."""
+        matches = self.match(text)
+        return matches[0][0] if matches else None
+
+
+def _naive_match(intents, text):
+    """The original substring loop (extended to report every intent), for benchmarking."""
+    text = text.lower()
+    return [intent for intent, keywords in intents.items() if any(keyword in text for keyword in keywords)]
+
+
+def benchmark(keyword_count=5000, transcript_words=2000, transcripts=20):
+    """Compare the compiled matcher with the substring loop on synthetic data."""
+    rng = random.Random(0)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    def word():
+        return "".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+
+    intents = {f"intent_{i}": [] for i in range(50)}
+    names = list(intents)
+    for i in range(keyword_count):
+        # Mix single words with a few two-word phrases
+        keyword = word() if i % 10 else f"{word()} {word()}"
+        intents[rng.choice(names)].append(keyword)
+    texts = [" ".join(word() for _ in range(transcript_words)) for _ in range(transcripts)]
+
+    start = time.perf_counter()
+    matcher = IntentMatcher(intents)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in texts:
+        _naive_match(intents, text)
+    naive = (time.perf_counter() - start) / transcripts
+
+    start = time.perf_counter()
+    for text in texts:
+        matcher.match(text)
+    compiled = (time.perf_counter() - start) / transcripts
+
+    print(f"{keyword_count} keywords, {transcript_words}-word transcripts")
+    print(f"substring loop:   {naive * 1000:.2f} ms/transcript")
+    print(f"compiled matcher: {compiled * 1000:.2f} ms/transcript (built in {compile_time * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    # Usage: python intent_matcher.py [keywords] [words_per_transcript]
+    benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 2000,
+    )
@@ -1,174 +1,190 @@
-import streamlit as st
-import openpyxl
-from datetime import datetime
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-import google.generativeai as genai
-import pyttsx3
-import speech_recognition as sr
-import os
-import threading
-
-# Configure Gemini API
-api_key = "API_KEY"
-genai.configure(api_key=api_key)
-
-# Initialize the SentimentIntensityAnalyzer
-analyzer = SentimentIntensityAnalyzer()
-
-# Function to create or load the CRM Excel file
-def create_or_load_excel():
-    if os.path.exists("CC.xlsx"):
-        workbook = openpyxl.load_workbook("CC.xlsx")
-    else:
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.append([
-            "Name", "Email", "Phone", "Company Name", "Deal ID", "Date of Interaction",
-            "User Complaint", "Recommendations", "Deal Recommendations", "Post-Call Summary"
-        ])
-    return workbook
-
-# Function to save data to the Excel file
-def save_to_excel(user_details, user_complaint, recommendations, deal_recommendations, postcall_summary):
-    try:
-        workbook = create_or_load_excel()
-        sheet = workbook.active
-
-        sentiment_score = analyzer.polarity_scores(user_complaint)["compound"]
-        sentiment = "Positive" if sentiment_score > 0.05 else "Negative" if sentiment_score < -0.05 else "Neutral"
-
-        deal_id = f"DEAL-{int(datetime.now().timestamp())}"
-        date_of_interaction = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        sheet.append([
-            user_details['name'], user_details['email'], user_details['phone'],
-            user_details['company'], deal_id, date_of_interaction,
-            user_complaint, recommendations, deal_recommendations, postcall_summary
-        ])
-
-        workbook.save("CC.xlsx")
-        return "Data saved successfully."
-    except Exception as e:
-        return f"Error saving data: {str(e)}"
-
-# Function to analyze user input using Gemini API
-def analyze_audio(text_input):
-    try:
-        generation_config = {
-            "temperature": 1,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,
-            "response_mime_type": "text/plain",
-        }
-
-        model = genai.GenerativeModel(
-            model_name="gemini-2.0-flash-exp",
-            generation_config=generation_config,
-            system_instruction=(
-                "You are the recommendation system to do the works like: "
-                "You need to analyze the voice input of the user and give the output like: "
-                "sentiment: analysis by the user input, intent: analysis by the user input, "
-                "tone: analysis by the user input, "
-                "recommendation: analysis by the user input, "
-                "deal recommendation: analysis by the user input and give deal recommendations of 5 points, "
-                "recommendations: analysis by the user input and give recommendations of 10 points, "
-                "postcall analysis: analysis of the conversation and give it in only 3 lines."
-            ),
-        )
-
-        chat_session = model.start_chat(
-            history=[{"role": "user", "parts": [text_input]}]
-        )
-
-        response = chat_session.send_message(text_input)
-        return response.text
-    except Exception as e:
-        return f"Error analyzing text: {str(e)}"
-
-# Function to speak text using pyttsx3
-def speak_text(text):
-    engine = pyttsx3.init()
-    engine.say(text)
-    engine.runAndWait()
-
-# Function to record audio using microphone
-def record_audio(prompt):
-    recognizer = sr.Recognizer()
-    microphone = sr.Microphone()
-
-    # Display and speak the prompt
-    st.write(f"**{prompt}**")
-    threading.Thread(target=speak_text, args=(prompt,)).start()
-
-    listening_placeholder = st.empty()  # Placeholder for dynamic updates
-
-    with microphone as source:
-        listening_placeholder.info("Listening for your input...")
-        recognizer.adjust_for_ambient_noise(source, duration=2)
-
-        try:
-            audio = recognizer.listen(source)
-            listening_placeholder.success("Processing your voice input...")
-            text = recognizer.recognize_google(audio)
-            st.write(f"**You said:** {text}")
-            listening_placeholder.empty()  # Clear the placeholder
-            return text
-        except sr.UnknownValueError:
-            listening_placeholder.error("Sorry, I couldn't understand that.")
-            return None
-        except sr.RequestError:
-            listening_placeholder.error("Sorry, there was an issue with the speech service.")
-            return None
-
-# Streamlit UI
-st.title("Real-Time AI Sales Intelligence and Dynamic Deal Recommendation System")
-
-if st.button("Start Conversation"):
-    with st.spinner("Initiating conversation..."):
-        user_details = {}
-
-        # Ask for name
-        user_details['name'] = record_audio("What is your name?")
-        if not user_details['name']:
-            st.error("Failed to capture your name.")
-            st.stop()
-
-        # Ask for email
-        user_details['email'] = record_audio("What is your email address?")
-        if not user_details['email']:
-            st.error("Failed to capture your email.")
-            st.stop()
-
-        # Ask for phone number
-        user_details['phone'] = record_audio("What is your phone number?")
-        if not user_details['phone']:
-            st.error("Failed to capture your phone number.")
-            st.stop()
-
-        # Ask for company name
-        user_details['company'] = record_audio("What is your company name?")
-        if not user_details['company']:
-            st.error("Failed to capture your company name.")
-            st.stop()
-
-        # Ask for complaint
-        complaint = record_audio("What is your complaint?")
-        if not complaint:
-            st.error("Failed to capture your complaint.")
-            st.stop()
-
-        # Analyze the complaint
-        recommendations = analyze_audio(complaint)
-        deal_recommendations = "Offer personalized discount on the next purchase."
-        postcall_summary = "The user had issues with product reliability. Recommended offering a discount on future purchases."
-
-        # Save to Excel
-        save_status = save_to_excel(user_details, complaint, recommendations, deal_recommendations, postcall_summary)
-
-        st.success("Conversation completed!")
-        st.subheader("Generated Results")
-        st.write("**Recommendations:**", recommendations)
-        st.write("**Deal Recommendations:**", deal_recommendations)
-        st.write("**Post-Call Summary:**", postcall_summary)
-        st.success(save_status)
+import streamlit as st
+from datetime import datetime
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from capture_session import CaptureSession
+from crm_store import CRM_COLUMNS, analysis_columns, open_store
+from crm_writer import CrmWriter
+from session_manager import SessionManager
+import google.generativeai as genai
+from gemini_models import ANALYSIS_SCHEMA, get_model, analyze_stream, parse_analysis
+import speech_recognition as sr
+import os
+import sys
+import time
+
+# Shared helpers live in the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from tts_worker import get_tts_worker
+from response_cache import get_response_cache
+
+# Configure Gemini API
+api_key = "API_KEY"
+genai.configure(api_key=api_key)
+
+# Gemini model settings for the complaint analysis
+MODEL_NAME = "gemini-2.0-flash-exp"
+
+GENERATION_CONFIG = {
+    "temperature": 1,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+    "response_mime_type": "application/json",
+    "response_schema": ANALYSIS_SCHEMA,
+}
+
+ANALYSIS_INSTRUCTION = (
+    "You are the recommendation system for a sales call centre. "
+    "Analyze the customer's voice input and return: "
+    "sentiment: Positive, Negative or Neutral, intent: analysis by the user input, "
+    "tone: analysis by the user input, "
+    "recommendations: 10 recommendations for the agent, "
+    "deal_recommendations: 5 deal recommendations, "
+    "postcall_summary: analysis of the conversation in exactly 3 lines."
+)
+
+# Cache of analyses keyed on the complaint text plus the prompt and model settings
+CACHE_CONFIG = {"model": MODEL_NAME, **GENERATION_CONFIG}
+response_cache = get_response_cache()
+
+# The VADER analyzer is built once per server process, not on every rerun
+@st.cache_resource
+def get_sentiment_analyzer():
+    return SentimentIntensityAnalyzer()
+
+def sentiment_score(text):
+    return get_sentiment_analyzer().polarity_scores(text)["compound"]
+
+# One background CRM writer shared by every session; Streamlit reruns reuse it.
+# The journal can be exported to CC.xlsx with `python crm_store.py CC.db CC.xlsx`
+@st.cache_resource
+def get_crm_writer():
+    return CrmWriter(open_store())
+
+crm_writer = get_crm_writer()
+
+# Function to save data to the CRM store
+def save_to_excel(user_details, user_complaint, analysis):
+    try:
+        deal_id = f"DEAL-{int(datetime.now().timestamp())}"
+        date_of_interaction = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        values = [
+            user_details['name'], user_details['email'], user_details['phone'],
+            user_details['company'], deal_id, date_of_interaction
+        ]
+        record = dict(zip(CRM_COLUMNS, values))
+        record["User Complaint"] = user_complaint
+        record.update(analysis_columns(analysis))
+
+        # Hand the record to the background writer; this only waits if the queue is full
+        crm_writer.submit(record, put_timeout=10)
+        return "Data queued for saving."
+    except Exception as e:
+        return f"Error saving data: {str(e)}"
+
+# Function to analyze the complaint using Gemini API (runs on the session manager's workers,
+# so it reports progress through `on_chunk` instead of Streamlit widgets)
+def analyze_complaint(text_input, on_chunk=None):
+    start = time.perf_counter()
+    # A complaint seen before is answered from the response cache
+    cached, tier = response_cache.lookup(text_input, ANALYSIS_INSTRUCTION, CACHE_CONFIG)
+    if cached is not None:
+        return cached
+
+    # Stream the analysis so the agent sees progress immediately
+    model = get_model(MODEL_NAME, GENERATION_CONFIG, ANALYSIS_INSTRUCTION)
+    analysis_result, usage = analyze_stream(model, text_input, on_chunk=on_chunk)
+    analysis = parse_analysis(analysis_result)
+    response_cache.store(text_input, analysis, ANALYSIS_INSTRUCTION, CACHE_CONFIG, time.perf_counter() - start)
+    return analysis
+
+# Every browser session submits its conversations to one server-wide manager:
+# up to MAX_CALLS conversations run at once, and their recognition, analysis and
+# CRM saves share CALL_WORKERS background threads
+@st.cache_resource
+def get_session_manager():
+    return SessionManager(
+        open_capture=lambda device_index=None: CaptureSession(calibration_duration=2, device_index=device_index),
+        speak=lambda text: get_tts_worker().speak(text),
+        analyze=analyze_complaint,
+        save=save_to_excel,
+        sentiment=sentiment_score,
+        max_calls=int(os.environ.get("MAX_CALLS", "8")),
+        workers=int(os.environ.get("CALL_WORKERS", "4")),
+    )
+
+session_manager = get_session_manager()
+
+# Function to show the current state of one conversation
+def show_call(call):
+    done = call["status"] in ("done", "failed")
+    with st.expander(f"{call['label'] or 'Conversation'} ({call['id']}) - {call['status']}", expanded=not done):
+        if call["messages"]:
+            st.text("\n".join(call["messages"][-8:]))
+
+        # Live tone/sentiment readout while the complaint is being recorded
+        if call["live"] and not done:
+            live = call["live"]
+            st.markdown(
+                f"**Live tone:** {live['tone']} &nbsp; | &nbsp; "
+                f"**Live sentiment:** {live['sentiment']} ({live['compound']:+.2f})"
+            )
+
+        if call["status"] == "running" and call["partial_analysis"]:
+            st.code(call["partial_analysis"], language="json")
+
+        if call["status"] == "failed":
+            st.error(call["error"])
+        elif call["status"] == "done":
+            result = call["result"]
+            analysis = result["analysis"]
+            st.success("Conversation completed!")
+            st.subheader("Generated Results")
+            st.write("**You said:**", result["complaint"])
+            st.write("**Sentiment:**", analysis["sentiment"])
+            st.write("**Intent:**", analysis["intent"])
+            st.write("**Tone:**", analysis["tone"])
+            st.write("**Recommendations:**")
+            st.markdown("\n".join(f"{i}. {item}" for i, item in enumerate(analysis["recommendations"], 1)))
+            st.write("**Deal Recommendations:**")
+            st.markdown("\n".join(f"{i}. {item}" for i, item in enumerate(analysis["deal_recommendations"], 1)))
+            st.write("**Post-Call Summary:**")
+            st.markdown("  \n".join(analysis["postcall_summary"]))
+            st.success(result["save_status"])
+            timings = result["timings"]
+            st.caption(f"Call time: {timings['total']:.1f}s, " + ", ".join(
+                f"{name}={seconds:.1f}s" for name, seconds in timings["stages"].items()))
+
+# Streamlit UI
+st.title("Real-Time AI Sales Intelligence and Dynamic Deal Recommendation System")
+
+if "call_ids" not in st.session_state:
+    st.session_state.call_ids = []
+
+with st.sidebar:
+    station = st.text_input("Agent station", "Station 1")
+    microphones = sr.Microphone.list_microphone_names()
+    device_index = st.selectbox(
+        "Microphone", range(len(microphones)), format_func=lambda i: microphones[i]
+    ) if microphones else None
+
+if st.button("Start Conversation"):
+    # Returns at once; the conversation runs on the session manager's threads
+    call = session_manager.start(station, device_index=device_index)
+    st.session_state.call_ids.append(call.id)
+
+# Poll this browser session's conversations without blocking the script thread
+@st.fragment(run_every=1.0)
+def show_calls():
+    stats = session_manager.stats()
+    st.caption(f"Server: {stats['running']} running, {stats['queued']} queued, "
+               f"{stats['done']} completed, {stats['failed']} failed")
+    for call_id in reversed(st.session_state.call_ids):
+        call = session_manager.get(call_id)
+        if call is not None:
+            show_call(call.snapshot())
+
+show_calls()
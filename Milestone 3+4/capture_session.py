@@ -0,0 +1,80 @@
+import os
+import sys
+import speech_recognition as sr
+
+# Shared helpers live in the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from asr_backends import get_recognizer
+from vad import Endpointer, listen_for_speech
+
+
+class CaptureSession:
+    """One open microphone stream shared by every prompt in a conversation.
+
+    The ambient-noise calibration runs once when the session opens. After that
+    the voice activity detector keeps tracking the background level while it
+    waits for speech, so later prompts don't need to recalibrate. Each answer
+    starts at speech onset and ends after `trailing_silence` seconds of
+    silence, trimmed to the voiced audio.
+
+    Use as a context manager:
+
+        with CaptureSession() as session:
+            audio = session.listen()
+    """
+
+    def __init__(self, calibration_duration=2, device_index=None, asr=None, trailing_silence=0.7):
+        self.calibration_duration = calibration_duration
+        # Speech-to-text backend (local Whisper on CPU unless ASR_BACKEND says otherwise)
+        self.asr = asr or get_recognizer()
+        self.microphone = sr.Microphone(device_index=device_index)
+        # Voice activity detection and endpointing (VAD_BACKEND picks webrtc or energy)
+        self.endpointer = Endpointer(self.microphone.SAMPLE_RATE, trailing_silence=trailing_silence)
+        self.source = None
+
+    def open(self):
+        """Open the input stream and calibrate for ambient noise."""
+        if self.source is None:
+            self.source = self.microphone.__enter__()
+            self.endpointer.calibrate(self.source.stream.read(int(self.calibration_duration * self.source.SAMPLE_RATE)))
+        return self
+
+    def close(self):
+        """Close the input stream."""
+        if self.source is not None:
+            self.microphone.__exit__(None, None, None)
+            self.source = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def energy_threshold(self):
+        return getattr(self.endpointer.vad, "threshold", None)
+
+    @property
+    def sample_rate(self):
+        return self.microphone.SAMPLE_RATE
+
+    def listen(self, timeout=None, phrase_time_limit=None, on_chunk=None):
+        """Record one utterance from the open stream and return it as AudioData.
+
+        Raises sr.WaitTimeoutError if no speech starts within `timeout` seconds;
+        `phrase_time_limit` caps the length of the utterance. `on_chunk(data)`
+        receives each raw 16-bit PCM chunk as it is captured, e.g. to feed a
+        live tone analyzer while the caller is still talking.
+        """
+        if self.source is None:
+            self.open()
+        self.endpointer.no_speech_timeout = timeout
+        self.endpointer.max_speech = phrase_time_limit
+        return listen_for_speech(self.source, self.endpointer, on_chunk=on_chunk)
+
+    def recognize(self, audio):
+        """Transcribe an utterance recorded by this session."""
+        return self.asr.transcribe(audio)
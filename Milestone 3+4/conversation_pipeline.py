@@ -0,0 +1,375 @@
+import os
+import sys
+import time
+import wave
+import threading
+import contextlib
+from concurrent.futures import Future, ThreadPoolExecutor
+import speech_recognition as sr
+
+# Details asked before the complaint, in order, as (field, prompt)
+DETAIL_PROMPTS = [
+    ("name", "Please say your name."),
+    ("email", "Please say your email address."),
+    ("phone", "Please say your phone number."),
+    ("company", "Please say your company name."),
+]
+
+COMPLAINT_PROMPT = "Now, how may I help you?"
+WAIT_PROMPT = "Thank you. I will now generate recommendations based on your complaint."
+CLOSING_PROMPT = "Execution completed. Thank you for your input."
+
+# Order in which stages are listed in reports
+STAGES = ["speak", "listen", "recognize", "sentiment", "analyze", "save"]
+
+
+class StageTimer:
+    """Records the busy time of every stage of one call, and the call's wall time.
+
+    Stages running on different threads overlap, so the busy times can add up
+    to more than the wall time; the difference is reported as `overlap`.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name, label=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.spans.append((name, label, started - self.start, time.perf_counter() - self.start))
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    def report(self):
+        """Return the wall time, per-stage busy seconds and the overlap, in seconds."""
+        total = (self.end or time.perf_counter()) - self.start
+        stages = {}
+        with self._lock:
+            for name, _, started, ended in self.spans:
+                stages[name] = stages.get(name, 0.0) + ended - started
+        return {"total": total, "stages": stages, "overlap": max(0.0, sum(stages.values()) - total)}
+
+    def summary(self):
+        report = self.report()
+        parts = [f"total={report['total']:.2f}s"]
+        for name in STAGES + sorted(set(report["stages"]) - set(STAGES)):
+            if name in report["stages"]:
+                parts.append(f"{name}={report['stages'][name]:.2f}s")
+        parts.append(f"overlap={report['overlap']:.2f}s")
+        return ", ".join(parts)
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class ConversationPipeline:
+    """Runs one call with prompting, capture, recognition and analysis overlapped.
+
+    The microphone and the speaker are used strictly in turn (a prompt is never
+    spoken while the caller is being recorded), but everything else moves to
+    worker threads:
+
+    - each answer is transcribed while the next prompt is spoken and the next
+      answer recorded;
+    - the complaint's sentiment and LLM analysis start as soon as it has been
+      transcribed, while the wait prompt is spoken and earlier answers that
+      could not be understood are asked again;
+    - the CRM save runs while the closing message is spoken.
+
+    `speak(text)` must block until the text has been spoken. `analyze(text)`
+    returns the analysis dict (or None on failure), `sentiment(text)` an
+    optional score and `save(details, complaint, analysis)` stores the result.
+    With `pipelined=False` the same stages run one after another, as the
+    original sequential flow did.
+
+    Progress messages go to `log` (print by default) and every understood
+    answer to `on_answer(field, text)`. `on_listen(field)` may return an
+    `on_chunk` callback that receives the audio while that answer is recorded.
+    Pass a shared `executor` to run the background stages of many calls on
+    one worker pool; otherwise each call starts its own.
+    """
+
+    def __init__(self, session, speak, analyze, save=None, sentiment=None,
+                 details=DETAIL_PROMPTS, complaint_prompt=COMPLAINT_PROMPT,
+                 wait_prompt=WAIT_PROMPT, closing_prompt=CLOSING_PROMPT,
+                 retries=1, workers=3, pipelined=True, executor=None,
+                 log=print, on_answer=None, on_listen=None):
+        self.session = session
+        self.speak = speak
+        self.analyze = analyze
+        self.save = save
+        self.sentiment = sentiment
+        self.details = list(details)
+        self.complaint_prompt = complaint_prompt
+        self.wait_prompt = wait_prompt
+        self.closing_prompt = closing_prompt
+        self.retries = retries
+        self.workers = workers
+        self.pipelined = pipelined
+        self.shared_executor = executor
+        self.log = log
+        self.on_answer = on_answer
+        self.on_listen = on_listen
+        self._executor = None
+
+    def _submit(self, fn, *args):
+        if self._executor is None:
+            try:
+                return _done(fn(*args))
+            except Exception as e:
+                future = Future()
+                future.set_exception(e)
+                return future
+        return self._executor.submit(fn, *args)
+
+    def _say(self, text, timer, label=None):
+        if text:
+            self.log(text)
+            with timer.stage("speak", label):
+                self.speak(text)
+
+    def _listen(self, field, timer):
+        self.log("Listening for your command...")
+        on_chunk = self.on_listen(field) if self.on_listen is not None else None
+        with timer.stage("listen", field):
+            try:
+                return self.session.listen(on_chunk=on_chunk)
+            except sr.WaitTimeoutError:
+                self.log(f"No speech heard for the {field}.")
+                return None
+
+    def _recognize(self, field, audio, timer):
+        if audio is None:
+            return None
+        with timer.stage("recognize", field):
+            try:
+                text = self.session.recognize(audio)
+            except sr.UnknownValueError:
+                self.log(f"Sorry, I couldn't understand the {field}.")
+                return None
+            except sr.RequestError:
+                self.log("Sorry, there was an issue with the speech service.")
+                return None
+        self.log(f"User said ({field}): {text}")
+        if text and self.on_answer is not None:
+            self.on_answer(field, text)
+        return text or None
+
+    def _recognize_and_analyze(self, audio, timer):
+        complaint = self._recognize("complaint", audio, timer)
+        if not complaint:
+            return None, None, None
+        return (complaint,) + self._analyze(complaint, timer)
+
+    def _analyze(self, complaint, timer):
+        score = None
+        if self.sentiment is not None:
+            with timer.stage("sentiment"):
+                score = self.sentiment(complaint)
+        with timer.stage("analyze"):
+            analysis = self.analyze(complaint)
+        return score, analysis
+
+    def _ask_again(self, field, prompt, timer):
+        """Re-ask a question whose answer was not understood; returns the text or None."""
+        for _ in range(self.retries):
+            self._say(f"Sorry, I didn't catch that. {prompt}", timer, field)
+            text = self._recognize(field, self._listen(field, timer), timer)
+            if text:
+                return text
+        return None
+
+    def run(self):
+        """Hold the conversation; returns the call's result dict, or None if it failed."""
+        timer = StageTimer()
+        own_executor = None
+        if self.pipelined:
+            if self.shared_executor is None:
+                own_executor = ThreadPoolExecutor(self.workers, thread_name_prefix="call")
+            self._executor = self.shared_executor or own_executor
+        try:
+            return self._run(timer)
+        finally:
+            if own_executor is not None:
+                own_executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            timer.finish()
+            self.log(f"Call timings: {timer.summary()}")
+
+    def _run(self, timer):
+        self.log("\nPlease provide your details...")
+        answers = []
+        for field, prompt in self.details:
+            self._say(prompt, timer, field)
+            audio = self._listen(field, timer)
+            answers.append((field, prompt, self._submit(self._recognize, field, audio, timer)))
+
+        self._say(self.complaint_prompt, timer, "complaint")
+        audio = self._listen("complaint", timer)
+        complaint_future = self._submit(self._recognize_and_analyze, audio, timer)
+        self._say(self.wait_prompt, timer)
+
+        # Collect the details, asking again for any that weren't understood
+        user_details = {}
+        for field, prompt, future in answers:
+            user_details[field] = future.result() or self._ask_again(field, prompt, timer)
+            if not user_details[field]:
+                self.log(f"Failed to capture your {field}.")
+                return None
+
+        complaint, score, analysis = complaint_future.result()
+        if not complaint:
+            complaint = self._ask_again("complaint", self.complaint_prompt, timer)
+            if not complaint:
+                self.log("Failed to capture your complaint.")
+                return None
+            score, analysis = self._analyze(complaint, timer)
+        if not analysis:
+            return None
+
+        saved = None
+        if self.save is not None:
+            saved = self._submit(self._save, user_details, complaint, analysis, timer)
+        self._say(self.closing_prompt, timer)
+        save_status = saved.result() if saved is not None else None
+
+        return {
+            "details": user_details,
+            "complaint": complaint,
+            "sentiment_score": score,
+            "analysis": analysis,
+            "save_status": save_status,
+            "timings": timer.report(),
+        }
+
+    def _save(self, user_details, complaint, analysis, timer):
+        with timer.stage("save"):
+            return self.save(user_details, complaint, analysis)
+
+
+def load_wav_turns(directory, fields=None):
+    """Load `<field>.wav` recordings from `directory` as (AudioData, seconds) turns."""
+    fields = fields or [field for field, _ in DETAIL_PROMPTS] + ["complaint"]
+    turns = []
+    for field in fields:
+        path = os.path.join(directory, f"{field}.wav")
+        with wave.open(path, "rb") as f:
+            seconds = f.getnframes() / f.getframerate()
+        with sr.AudioFile(path) as source:
+            audio = sr.Recognizer().record(source)
+        turns.append((audio, seconds))
+    return turns
+
+
+class ScriptedSession:
+    """Stands in for a CaptureSession by replaying a scripted caller.
+
+    `turns` holds one (audio, speaking_seconds) pair per answer, in the order
+    the pipeline asks for them: `listen()` waits for as long as the caller
+    talks and returns the audio, `recognize()` hands it to `transcribe`.
+    """
+
+    sample_rate = 16000
+
+    def __init__(self, turns, transcribe):
+        self.turns = list(turns)
+        self.transcribe = transcribe
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    @classmethod
+    def from_wav_dir(cls, directory, asr, fields=None):
+        """Replay `<field>.wav` recordings from `directory` through a real ASR backend."""
+        return cls(load_wav_turns(directory, fields), asr.transcribe)
+
+    def listen(self, timeout=None, phrase_time_limit=None, on_chunk=None):
+        with self._lock:
+            audio, seconds = self.turns[self._next % len(self.turns)]
+            self._next += 1
+        time.sleep(seconds)
+        return audio
+
+    def recognize(self, audio):
+        return self.transcribe(audio)
+
+
+SCRIPT = [
+    "John Smith",
+    "john dot smith at example dot com",
+    "five five five one two three four",
+    "Acme Corporation",
+    "my last two deliveries arrived late and the tracking page never updated so I want to know what happened",
+]
+
+
+def simulated_turns(talk_rate=2.5, scale=1.0):
+    """Turns for the scripted caller, whose "audio" is the text itself, spoken at `talk_rate` words/second."""
+    return [(text, len(text.split()) / talk_rate * scale) for text in SCRIPT]
+
+
+def benchmark(wav_dir=None, scale=0.25, speak_rate=2.5, talk_rate=2.5, asr_seconds=1.5, llm_seconds=3.0):
+    """Replay one scripted call sequentially and pipelined, and compare call times.
+
+    Without `wav_dir` every stage is simulated: prompts take `speak_rate`
+    words/second to speak, the caller talks at `talk_rate` words/second,
+    recognition takes `asr_seconds` per answer and the LLM `llm_seconds`.
+    With `wav_dir` the recordings are replayed through the configured ASR
+    backend instead. All simulated delays are multiplied by `scale`.
+    """
+    def speak(text):
+        time.sleep(len(text.split()) / speak_rate * scale)
+
+    def analyze(text):
+        time.sleep(llm_seconds * scale)
+        return {"sentiment": "Negative"}
+
+    def save(details, complaint, analysis):
+        time.sleep(0.05 * scale)
+
+    def make_session():
+        if wav_dir:
+            from asr_backends import get_recognizer
+            return ScriptedSession.from_wav_dir(wav_dir, get_recognizer())
+
+        def transcribe(text):
+            time.sleep(asr_seconds * scale)
+            return text
+        return ScriptedSession(simulated_turns(talk_rate, scale), transcribe)
+
+    results = {}
+    for pipelined in [False, True]:
+        pipeline = ConversationPipeline(make_session(), speak, analyze, save, sentiment=len, pipelined=pipelined)
+        results[pipelined] = pipeline.run()["timings"]
+
+    sequential, overlapped = results[False]["total"], results[True]["total"]
+    print(f"\nSequential call: {sequential:.2f}s, pipelined call: {overlapped:.2f}s "
+          f"({1 - overlapped / sequential:.0%} shorter, {sequential / overlapped:.2f}x)")
+
+
+if __name__ == "__main__":
+    # Usage: python conversation_pipeline.py [wav_dir] [scale]
+    # Shared helpers live in the repository root
+    ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if ROOT_DIR not in sys.path:
+        sys.path.append(ROOT_DIR)
+    benchmark(
+        sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] != "-" else None,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.25,
+    )
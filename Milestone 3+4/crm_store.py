@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import threading
+import contextlib
+import openpyxl
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Column layout of the CRM workbook (CC.xlsx)
+CRM_COLUMNS = [
+    "Name", "Email", "Phone", "Company Name", "Deal ID", "Date of Interaction",
+    "Sentiment", "Intent", "Tone",
+    "User Complaint", "Recommendations", "Deal Recommendations", "Post-Call Summary"
+]
+
+# Headers used by workbooks written before the journal existed, and their current names
+LEGACY_COLUMNS = {
+    "Email Address": "Email",
+    "Company": "Company Name",
+    "Interaction time": "Date of Interaction",
+    "User Query": "User Complaint",
+    "Analysis based on User Query": "Analysis",
+    "Deal Recommendation": "Deal Recommendations",
+    "Post Call Summary": "Post-Call Summary",
+}
+
+
+def analysis_columns(analysis):
+    """Map a structured Gemini analysis onto its CRM columns."""
+    return {
+        "Sentiment": analysis["sentiment"],
+        "Intent": analysis["intent"],
+        "Tone": analysis["tone"],
+        "Recommendations": "\n".join(analysis["recommendations"]),
+        "Deal Recommendations": "\n".join(analysis["deal_recommendations"]),
+        "Post-Call Summary": "\n".join(analysis["postcall_summary"]),
+    }
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold an exclusive cross-process lock on `path` (created if missing)."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            # LK_LOCK retries for ~10 seconds before giving up, so loop on it
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class CrmStore:
+    """Base class for CRM storage backends.
+
+    A backend is an append-only journal of records (dicts keyed by column name).
+    Appending a record never reads or rewrites the existing history.
+    """
+
+    def append(self, record):
+        """Append a single record to the journal."""
+        self.append_many([record])
+
+    def append_many(self, records):
+        """Append several records in one write."""
+        raise NotImplementedError
+
+    def records(self):
+        """Yield every stored record in insertion order."""
+        raise NotImplementedError
+
+    def count(self):
+        """Return the number of stored records."""
+        return sum(1 for _ in self.records())
+
+    def close(self):
+        pass
+
+
+class SqliteCrmStore(CrmStore):
+    """CRM journal stored in a SQLite database running in WAL mode.
+
+    SQLite serialises writers across processes itself; every append takes the
+    write lock up front (BEGIN IMMEDIATE) and waits up to `timeout` seconds for it.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        # Schema setup races with other stations opening the same file
+        with file_lock(path + ".lock"):
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS crm_records ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "recorded_at TEXT NOT NULL, "
+                "data TEXT NOT NULL)"
+            )
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append_many(self, records):
+        conn = self._connect()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(now, json.dumps(record)) for record in records]
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT INTO crm_records (recorded_at, data) VALUES (?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def records(self):
+        conn = self._connect()
+        for (data,) in conn.execute("SELECT data FROM crm_records ORDER BY id"):
+            yield json.loads(data)
+
+    def count(self):
+        conn = self._connect()
+        return conn.execute("SELECT COUNT(*) FROM crm_records").fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class JsonlCrmStore(CrmStore):
+    """CRM journal stored as a line-delimited JSON log.
+
+    Appends hold an exclusive lock on a sidecar `.lock` file so several
+    processes can write to the same log without interleaving lines.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append_many(self, records):
+        data = "".join(json.dumps(record) + "\n" for record in records)
+        with self._lock, file_lock(self.path + ".lock"):
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def open_store(path=None):
+    """Open the CRM store at `path`, picking the backend from the file extension.
+
+    Without `path`, the `CRM_STORE` environment variable or "CC.db" is used.
+    """
+    path = path or os.environ.get("CRM_STORE", "CC.db")
+    if path.endswith(".jsonl"):
+        return JsonlCrmStore(path)
+    return SqliteCrmStore(path)
+
+
+def _record_key(record):
+    # Workbook cells come back as None or numbers, so compare as text
+    return tuple(str(record.get(column) or "") for column in ("Deal ID", "Date of Interaction", "Name", "User Complaint"))
+
+
+def read_workbook(excel_path):
+    """Return the rows of a CRM workbook as records, renaming legacy headers."""
+    if not os.path.exists(excel_path):
+        return []
+    workbook = openpyxl.load_workbook(excel_path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            return []
+        columns = [LEGACY_COLUMNS.get(name, name) for name in header]
+        return [
+            {column: value for column, value in zip(columns, row) if column and value is not None}
+            for row in rows if any(value is not None for value in row)
+        ]
+    finally:
+        workbook.close()
+
+
+def import_from_excel(store, excel_path="CC.xlsx"):
+    """Append the workbook's rows that the store doesn't have yet; returns how many.
+
+    Run once to bring the history of a workbook written by the old scripts
+    into the journal, so exporting over it keeps those rows.
+    """
+    known = {_record_key(record) for record in store.records()}
+    missing = [record for record in read_workbook(excel_path) if _record_key(record) not in known]
+    if missing:
+        store.append_many(missing)
+    return len(missing)
+
+
+def export_to_excel(store, excel_path="CC.xlsx", columns=None):
+    """Write every record in the store to an Excel workbook with the CRM columns.
+
+    Without `columns`, the standard CRM columns are used, followed by any extra
+    fields the records carry (e.g. "Sentiment Score" from main.py).
+
+    The workbook is written to a temporary file and renamed over `excel_path`,
+    so readers never see a half-written file and concurrent exports don't clash.
+    An existing workbook holding rows the store doesn't have is never
+    overwritten (ValueError); bring them in with `import_from_excel` first.
+    """
+    known = {_record_key(record) for record in store.records()}
+    unknown = sum(1 for record in read_workbook(excel_path) if _record_key(record) not in known)
+    if unknown:
+        raise ValueError(f"{excel_path} has {unknown} rows that are not in the CRM store; "
+                         f"import them with import_from_excel() before exporting")
+
+    if columns is None:
+        columns = list(CRM_COLUMNS)
+        for record in store.records():
+            columns.extend(key for key in record if key not in columns)
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    rows = 0
+    for record in store.records():
+        sheet.append([record.get(column, "") for column in columns])
+        rows += 1
+
+    directory = os.path.dirname(os.path.abspath(excel_path))
+    fd, temp_path = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+    os.close(fd)
+    try:
+        workbook.save(temp_path)
+        with file_lock(excel_path + ".lock"):
+            os.replace(temp_path, excel_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return rows
+
+
+def start_periodic_export(store, excel_path="CC.xlsx", interval=300, columns=None):
+    """Export the store to Excel every `interval` seconds on a daemon thread."""
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval):
+            try:
+                export_to_excel(store, excel_path, columns)
+            except Exception as e:
+                print(f"Error exporting CRM data: {e}")
+
+    threading.Thread(target=run, daemon=True).start()
+    return stop_event
+
+
+if __name__ == "__main__":
+    # Usage: python crm_store.py [store_path] [excel_path]
+    # Rows already in the workbook but not in the store are imported first, so none are lost.
+    store_path = sys.argv[1] if len(sys.argv) > 1 else None
+    excel_path = sys.argv[2] if len(sys.argv) > 2 else "CC.xlsx"
+    store = open_store(store_path)
+    imported = import_from_excel(store, excel_path)
+    if imported:
+        print(f"Imported {imported} existing rows from {excel_path}")
+    rows = export_to_excel(store, excel_path)
+    print(f"Exported {rows} records to {excel_path}")
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+from crm_store import open_store
+
+# Usage: python crm_stress.py [rows_per_writer] [backend: .db | .jsonl]
+# Spawns 1, 2, 4, ... writer processes against one shared store and checks that
+# every row each writer appended is present afterwards.
+
+WRITER_COUNTS = [1, 2, 4, 8, 16]
+
+
+def writer(store_path, writer_id, rows, start_event):
+    store = open_store(store_path)
+    start_event.wait()
+    for seq in range(rows):
+        store.append({"Name": f"writer-{writer_id}", "Deal ID": f"{writer_id}-{seq}"})
+    store.close()
+
+
+def run(store_path, writers, rows):
+    start_event = multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=writer, args=(store_path, i, rows, start_event))
+        for i in range(writers)
+    ]
+    for p in processes:
+        p.start()
+    start = time.perf_counter()
+    start_event.set()
+    for p in processes:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    expected = {f"{i}-{seq}" for i in range(writers) for seq in range(rows)}
+    found = [record["Deal ID"] for record in open_store(store_path).records()]
+    lost = len(expected - set(found))
+    duplicated = len(found) - len(set(found))
+    return elapsed, len(found), lost, duplicated
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    extension = sys.argv[2] if len(sys.argv) > 2 else ".db"
+    os.environ.pop("CRM_STORE", None)
+
+    print(f"{'writers':>8} {'rows':>8} {'seconds':>9} {'rows/sec':>10} {'lost':>6} {'dup':>5}")
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for writers in WRITER_COUNTS:
+            store_path = os.path.join(directory, f"stress-{writers}{extension}")
+            elapsed, total, lost, duplicated = run(store_path, writers, rows)
+            print(f"{writers:>8} {total:>8} {elapsed:>9.2f} {total / elapsed:>10.0f} {lost:>6} {duplicated:>5}")
+            failed = failed or lost or duplicated
+    if failed:
+        print("FAILED: rows were lost or duplicated.")
+        sys.exit(1)
+    print("OK: no rows lost.")
+
+
+if __name__ == "__main__":
+    main()
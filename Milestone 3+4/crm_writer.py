@@ -0,0 +1,107 @@
+import time
+import queue
+import atexit
+import threading
+from crm_store import JsonlCrmStore
+
+_STOP = object()
+
+
+class CrmWriter:
+    """Background write-behind writer for the CRM store.
+
+    Finished interactions are put on a bounded queue and a single writer thread
+    flushes them to the store in groups, either when `batch_size` records are
+    waiting or `flush_interval` seconds have passed since the first one arrived.
+    Producers block (up to `put_timeout`) when the queue is full. Batches that
+    can't be written after retrying are spilled to `fallback_path` so nothing
+    accepted by `submit` is lost.
+    """
+
+    def __init__(self, store, max_queue=1000, batch_size=50, flush_interval=1.0,
+                 fallback_path="crm_unsaved.jsonl"):
+        self.store = store
+        self.fallback = JsonlCrmStore(fallback_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self.batches_written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        # close() waits for submits already past the closed check, so no record lands after _STOP
+        self._putting = 0
+        self._idle = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="crm-writer", daemon=True)
+        self._thread.start()
+        # Drain whatever is still queued when the interpreter exits
+        atexit.register(self.close)
+
+    def submit(self, record, put_timeout=None):
+        """Queue a record for writing; blocks while the queue is full.
+
+        Raises queue.Full if `put_timeout` expires before there is room.
+        """
+        with self._idle:
+            if self._closed:
+                raise RuntimeError("CRM writer is closed")
+            self._putting += 1
+        try:
+            # Blocking put outside the lock, so `put_timeout` bounds each producer's wait
+            self._queue.put(record, timeout=put_timeout)
+        finally:
+            with self._idle:
+                self._putting -= 1
+                self._idle.notify_all()
+
+    def pending(self):
+        """Return the number of records waiting to be written."""
+        return self._queue.qsize()
+
+    def close(self, timeout=None):
+        """Stop accepting records, flush everything queued and wait for the writer."""
+        with self._idle:
+            if self._closed:
+                return
+            self._closed = True
+            # The writer keeps draining meanwhile, so these puts finish
+            self._idle.wait_for(lambda: self._putting == 0)
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        # Group commit: one transaction for the whole batch
+        for attempt in range(3):
+            try:
+                self.store.append_many(batch)
+                self.records_written += len(batch)
+                self.batches_written += 1
+                return
+            except Exception as e:
+                print(f"Error writing CRM batch (attempt {attempt + 1}): {e}")
+                time.sleep(0.5 * (attempt + 1))
+        self.fallback.append_many(batch)
+        print(f"Spilled {len(batch)} CRM records to {self.fallback.path}.")
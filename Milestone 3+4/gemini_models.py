@@ -0,0 +1,134 @@
+import json
+import threading
+import google.generativeai as genai
+
+# Process-wide cache of configured Gemini models, keyed by model name,
+# generation config and system instruction. Every cached model shares the
+# SDK's default client, so its gRPC/HTTP connections stay open between calls.
+_models = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_model(model_name, generation_config, system_instruction):
+    """Return a cached `genai.GenerativeModel`, building it on first use."""
+    key = (model_name, json.dumps(generation_config, sort_keys=True), system_instruction)
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            _stats["hits"] += 1
+            return model
+        _stats["misses"] += 1
+        model = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config=generation_config,
+            system_instruction=system_instruction,
+        )
+        _models[key] = model
+        return model
+
+
+def registry_stats():
+    """Return hit/miss counts and the number of cached models."""
+    with _lock:
+        return {"hits": _stats["hits"], "misses": _stats["misses"], "models": len(_models)}
+
+
+def clear_registry():
+    """Drop every cached model (e.g. after changing the API key)."""
+    with _lock:
+        _models.clear()
+
+
+def usage_of(response):
+    """Return the token usage reported for a Gemini response."""
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+        "output_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        "total_tokens": getattr(usage, "total_token_count", 0) or 0,
+    }
+
+
+def analyze_once(model, text):
+    """Stateless single-shot analysis: the text is sent exactly once.
+
+    Returns the response text and its token usage.
+    """
+    response = model.generate_content(text)
+    return response.text, usage_of(response)
+
+
+def analyze_stream(model, text, on_chunk=None):
+    """Single-shot analysis that streams the response as it is generated.
+
+    `on_chunk(chunk_text, text_so_far)` is called for every chunk received.
+    Returns the full response text and its token usage.
+    """
+    response = model.generate_content(text, stream=True)
+    parts = []
+    for chunk in response:
+        if not chunk.text:
+            continue
+        parts.append(chunk.text)
+        if on_chunk is not None:
+            on_chunk(chunk.text, "".join(parts))
+    return "".join(parts), usage_of(response)
+
+
+class AnalysisConversation:
+    """Multi-turn analysis that keeps the chat history across one call.
+
+    Each `send` adds only the new message; earlier turns are carried by the
+    chat session instead of being re-seeded. Token usage is accumulated.
+    """
+
+    def __init__(self, model):
+        self.chat = model.start_chat(history=[])
+        self.turns = 0
+        self.usage = {"prompt_tokens": 0, "output_tokens": 0, "total_tokens": 0}
+
+    def send(self, text):
+        """Send the next message and return the reply text and its token usage."""
+        response = self.chat.send_message(text)
+        usage = usage_of(response)
+        for key in self.usage:
+            self.usage[key] += usage[key]
+        self.turns += 1
+        return response.text, usage
+
+
+# Response schema for the structured complaint analysis. Used with
+# "response_mime_type": "application/json" so one request returns every field.
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "sentiment": {"type": "string", "enum": ["Positive", "Negative", "Neutral"]},
+        "intent": {"type": "string", "description": "What the customer wants, in a few words."},
+        "tone": {"type": "string", "description": "The customer's tone, in a few words."},
+        "recommendations": {
+            "type": "array", "items": {"type": "string"},
+            "description": "Exactly 10 recommendations for the agent.",
+        },
+        "deal_recommendations": {
+            "type": "array", "items": {"type": "string"},
+            "description": "Exactly 5 deal recommendations.",
+        },
+        "postcall_summary": {
+            "type": "array", "items": {"type": "string"},
+            "description": "Post-call summary in exactly 3 lines.",
+        },
+    },
+    "required": ["sentiment", "intent", "tone", "recommendations", "deal_recommendations", "postcall_summary"],
+}
+
+
+def parse_analysis(text):
+    """Parse a structured analysis response into a dict of typed fields."""
+    analysis = json.loads(text)
+    for field in ("recommendations", "deal_recommendations", "postcall_summary"):
+        value = analysis.get(field, [])
+        analysis[field] = [value] if isinstance(value, str) else list(value)
+    for field in ("sentiment", "intent", "tone"):
+        analysis[field] = str(analysis.get(field, ""))
+    return analysis
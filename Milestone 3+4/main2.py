@@ -1,176 +1,130 @@
-import os
-import time
-import pyaudio
-import pyttsx3
-import speech_recognition as sr
-import google.generativeai as genai
-import openpyxl
-from datetime import datetime
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-
-# Configure Gemini API
-api_key = "API_KEY"
-genai.configure(api_key=api_key)
-
-# Initialize text-to-speech engine
-engine = pyttsx3.init()
-
-# Initialize the SentimentIntensityAnalyzer
-analyzer = SentimentIntensityAnalyzer()
-
-# Create or load the Excel file
-def create_or_load_excel():
-    """Creates or loads the CRM Excel file."""
-    if os.path.exists("CC.xlsx"):
-        workbook = openpyxl.load_workbook("CC.xlsx")
-    else:
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.append([
-            "Name", "Email", "Phone", "Company Name", "Deal ID", "Date of Interaction",
-            "User Complaint", "Recommendations", "Deal Recommendations", "Post-Call Summary"
-        ])
-    return workbook
-
-def record_audio(prompt=None):
-    """Capture live audio from the microphone and return it as text."""
-    recognizer = sr.Recognizer()
-    microphone = sr.Microphone()
-
-    if prompt:
-        print(prompt)
-        engine.say(prompt)
-        engine.runAndWait()
-    
-    print("Adjusting for ambient noise... Please wait.")
-    with microphone as source:
-        recognizer.adjust_for_ambient_noise(source, duration=2)  # Adjust ambient noise level
-
-    print("Listening for your command...")
-    with microphone as source:
-        try:
-            audio = recognizer.listen(source)
-            print("Processing your voice input...")
-            text = recognizer.recognize_google(audio)
-            print(f"User said: {text}")
-            return text
-        except sr.UnknownValueError:
-            print("Sorry, I couldn't understand that.")
-            return None
-        except sr.RequestError:
-            print("Sorry, there was an issue with the speech service.")
-            return None
-
-def analyze_audio(text_input):
-    """Send text input to Gemini API for analysis."""
-    # Create the model configuration
-    generation_config = {
-        "temperature": 1,
-        "top_p": 0.95,
-        "top_k": 40,
-        "max_output_tokens": 8192,
-        "response_mime_type": "text/plain",
-    }
-
-    # Initialize the model
-    model = genai.GenerativeModel(
-        model_name="gemini-2.0-flash-exp",
-        generation_config=generation_config,
-        system_instruction=( 
-            "You are the recommendation system to do the works like: "
-            "You need to analyze the voice input of the user and give the output like: "
-            "sentiment: analysis by the user input, intent: analysis by the user input, "
-            "tone: analysis by the user input, "
-            "recommendation: analysis by the user input, "
-            "deal recommendation: analysis by the user input and give deal recommendations of 5 points, "
-            "recommendations: analysis by the user input and give recommendations of 10 points," 
-            "postcall analysis: analysis of the conversation and give it in only 3 lines."
-        ),
-    )
-
-    # Start chat session
-    chat_session = model.start_chat(
-        history=[{"role": "user", "parts": [text_input]}]
-    )
-
-    # Send the text to the model and get the response
-    response = chat_session.send_message(text_input)
-    analysis_result = response.text
-    print(f"Analysis Result: {analysis_result}")
-    return analysis_result
-
-def save_to_excel(user_details, user_complaint, recommendations, deal_recommendations, postcall_summary):
-    """Save the results to the Excel file."""
-    workbook = create_or_load_excel()
-    sheet = workbook.active
-
-    # Generate Deal ID and Date of Interaction
-    deal_id = f"DEAL-{int(datetime.now().timestamp())}"
-    date_of_interaction = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-    # Add the new row to the sheet
-    sheet.append([
-        user_details['name'], user_details['email'], user_details['phone'],
-        user_details['company'], deal_id, date_of_interaction,
-        user_complaint, recommendations, deal_recommendations, postcall_summary
-    ])
-
-
-
-
-    # Save the workbook
-    workbook.save("CC.xlsx")
-    print("Data saved to Crm_data.xlsx")
-
-def main():
-    """Main function to capture and process live voice input and user details."""
-    user_details = {}
-
-    print("\nPlease provide your details...")
-
-    # Capture user name
-    user_details['name'] = record_audio("Please say your name.")
-    if not user_details['name']:
-        return
-
-    # Capture user email
-    user_details['email'] = record_audio("Please say your email address.")
-    if not user_details['email']:
-        return
-
-    # Capture user phone number
-    user_details['phone'] = record_audio("Please say your phone number.")
-    if not user_details['phone']:
-        return
-
-    # Capture user company name
-    user_details['company'] = record_audio("Please say your company name.")
-    if not user_details['company']:
-        return
-
-    print("\nNow, How may I help you ?")
-    user_complaint = record_audio()
-    if not user_complaint:
-        return
-
-    # Analyze sentiment
-    sentiment_score = analyzer.polarity_scores(user_complaint)["compound"]
-
-    print("\nNow, I will generate recommendations based on your query.")
-    recommendations = analyze_audio(user_complaint)
-
-    # Deal Recommendations (Simulating for now as an example)
-    deal_recommendations = "Offer personalized discount on the next purchase."
-
-    # Post-call Summary (Simulating for now as an example)
-    postcall_summary = "The user had issues with product reliability. Recommended offering a discount on future purchases."
-
-    # Save the results to the Excel file
-    save_to_excel(user_details, user_complaint, recommendations, deal_recommendations, postcall_summary)
-    
-    # Provide voice feedback for completion
-    engine.say("Execution completed. Thank you for your input.")
-    engine.runAndWait()
-
-if __name__ == "__main__":
-    main()
+import os
+import sys
+import time
+import pyaudio
+import google.generativeai as genai
+from gemini_models import ANALYSIS_SCHEMA, get_model, analyze_once, parse_analysis
+from datetime import datetime
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from capture_session import CaptureSession
+from conversation_pipeline import ConversationPipeline
+from crm_store import CRM_COLUMNS, analysis_columns, open_store
+
+# Shared helpers live in the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from tts_worker import get_tts_worker
+from response_cache import get_response_cache
+
+# Configure Gemini API
+api_key = "API_KEY"
+genai.configure(api_key=api_key)
+
+# Shared text-to-speech worker (one engine for the whole session)
+tts = get_tts_worker()
+
+# Gemini model settings for the complaint analysis
+MODEL_NAME = "gemini-2.0-flash-exp"
+
+GENERATION_CONFIG = {
+    "temperature": 1,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+    "response_mime_type": "application/json",
+    "response_schema": ANALYSIS_SCHEMA,
+}
+
+ANALYSIS_INSTRUCTION = (
+    "You are the recommendation system for a sales call centre. "
+    "Analyze the customer's voice input and return: "
+    "sentiment: Positive, Negative or Neutral, intent: analysis by the user input, "
+    "tone: analysis by the user input, "
+    "recommendations: 10 recommendations for the agent, "
+    "deal_recommendations: 5 deal recommendations, "
+    "postcall_summary: analysis of the conversation in exactly 3 lines."
+)
+
+# Cache of analyses keyed on the complaint text plus the prompt and model settings
+CACHE_CONFIG = {"model": MODEL_NAME, **GENERATION_CONFIG}
+response_cache = get_response_cache()
+
+# Initialize the SentimentIntensityAnalyzer
+analyzer = SentimentIntensityAnalyzer()
+
+# Append-only CRM journal; export it to CC.xlsx with `python crm_store.py CC.db CC.xlsx`
+crm_store = open_store()
+
+def analyze_audio(text_input, conversation=None):
+    """Send text input to Gemini API for analysis.
+
+    By default the complaint is analyzed in one stateless request, and a
+    complaint seen before is answered from the response cache. Pass an
+    `AnalysisConversation` to add the text as the next turn of an ongoing chat
+    (never cached, since the answer depends on the history).
+    Returns a dict with sentiment, intent, tone, recommendations,
+    deal_recommendations and postcall_summary.
+    """
+    start = time.perf_counter()
+    if conversation is not None:
+        analysis_result, usage = conversation.send(text_input)
+    else:
+        cached, tier = response_cache.lookup(text_input, ANALYSIS_INSTRUCTION, CACHE_CONFIG)
+        if cached is not None:
+            print(f"Analysis Result ({tier} cache hit): {cached}")
+            return cached
+        # Reuse the cached model for this configuration
+        model = get_model(MODEL_NAME, GENERATION_CONFIG, ANALYSIS_INSTRUCTION)
+        analysis_result, usage = analyze_once(model, text_input)
+    print(f"Analysis Result: {analysis_result}")
+    print(f"Tokens used: {usage['prompt_tokens']} in, {usage['output_tokens']} out")
+    analysis = parse_analysis(analysis_result)
+    if conversation is None:
+        response_cache.store(text_input, analysis, ANALYSIS_INSTRUCTION, CACHE_CONFIG, time.perf_counter() - start)
+    return analysis
+
+def save_to_excel(user_details, user_complaint, analysis):
+    """Append the results to the CRM store."""
+    # Generate Deal ID and Date of Interaction
+    deal_id = f"DEAL-{int(datetime.now().timestamp())}"
+    date_of_interaction = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    values = [
+        user_details['name'], user_details['email'], user_details['phone'],
+        user_details['company'], deal_id, date_of_interaction
+    ]
+    record = dict(zip(CRM_COLUMNS, values))
+    record["User Complaint"] = user_complaint
+
+    # Each analysis field goes into its own column
+    record.update(analysis_columns(analysis))
+
+    # Append the new record to the journal (no workbook load/save)
+    crm_store.append(record)
+    print("Data saved to CC.db")
+
+def main():
+    """Main function to capture and process live voice input and user details."""
+    # Open the microphone and calibrate once for the whole conversation
+    print("Adjusting for ambient noise... Please wait.")
+    with CaptureSession(calibration_duration=2) as session:
+        run_conversation(session)
+
+def run_conversation(session):
+    """Capture the user's details and complaint, analyze it and save it to the CRM.
+
+    Each answer is transcribed while the next question is asked, and the
+    complaint's analysis starts as soon as it has been transcribed.
+    """
+    pipeline = ConversationPipeline(
+        session,
+        speak=tts.speak,
+        analyze=analyze_audio,
+        save=save_to_excel,
+        sentiment=lambda text: analyzer.polarity_scores(text)["compound"],
+    )
+    return pipeline.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import contextlib
+from crm_store import CRM_COLUMNS, open_store
+from crm_writer import CrmWriter
+from session_manager import SessionManager
+from conversation_pipeline import ScriptedSession, load_wav_turns, simulated_turns
+
+# Usage: python session_load.py [wav_dir|-] [scale] [workers] [shared|station]
+# Runs 1, 2, 4, ... concurrent conversations through one SessionManager, each
+# replaying the same caller (recorded `<field>.wav` files from wav_dir through
+# the configured ASR backend, or a simulated caller), and checks that every
+# finished call reached the CRM store. By default prompts are spoken one at a
+# time across all calls, as app2.py's single TTS worker does; "station" gives
+# every call its own speaker.
+
+SESSION_COUNTS = [1, 2, 4, 8, 16, 32]
+
+
+def run(sessions, turns, transcribe, store_path, scale, workers, shared_tts=True, speak_rate=2.5, llm_seconds=3.0):
+    writer = CrmWriter(open_store(store_path), flush_interval=0.2,
+                       fallback_path=store_path + ".unsaved.jsonl")
+
+    def open_capture():
+        return ScriptedSession(turns, transcribe)
+
+    tts_lock = threading.Lock()
+
+    def speak(text):
+        # The process-wide TTS worker speaks one utterance at a time for every call
+        with tts_lock if shared_tts else contextlib.nullcontext():
+            time.sleep(len(text.split()) / speak_rate * scale)
+
+    def analyze(text, on_chunk):
+        # Stand-in for a streamed Gemini analysis
+        for i in range(3):
+            time.sleep(llm_seconds * scale / 3)
+            on_chunk("{}", "{}" * (i + 1))
+        return {"sentiment": "Negative", "intent": "Complaint", "tone": "Frustrated",
+                "recommendations": [], "deal_recommendations": [], "postcall_summary": []}
+
+    def save(details, complaint, analysis):
+        record = dict(zip(CRM_COLUMNS, [details["name"], details["email"], details["phone"], details["company"]]))
+        record["User Complaint"] = complaint
+        writer.submit(record, put_timeout=10)
+
+    manager = SessionManager(open_capture, speak, analyze, save, sentiment=len,
+                             max_calls=sessions, workers=workers, keep_finished=sessions, live=False)
+    start = time.perf_counter()
+    for i in range(sessions):
+        manager.start(f"station-{i}")
+    manager.shutdown(wait=True)
+    elapsed = time.perf_counter() - start
+    writer.close()
+
+    stats = manager.stats()
+    saved = open_store(store_path).count()
+    return elapsed, stats, saved
+
+
+def main():
+    wav_dir = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] != "-" else None
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 0.25
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    shared_tts = (sys.argv[4] if len(sys.argv) > 4 else "shared") != "station"
+    os.environ.pop("CRM_STORE", None)
+
+    if wav_dir:
+        # Shared helpers live in the repository root
+        ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if ROOT_DIR not in sys.path:
+            sys.path.append(ROOT_DIR)
+        from asr_backends import get_recognizer
+        turns, transcribe = load_wav_turns(wav_dir), get_recognizer().transcribe
+    else:
+        def transcribe(text):
+            time.sleep(1.5 * scale)
+            return text
+        turns = simulated_turns(scale=scale)
+
+    print(f"{'sessions':>8} {'seconds':>9} {'calls/min':>10} {'p50 call':>9} {'p95 call':>9} {'failed':>7} {'lost':>5}")
+    failed = False
+    with tempfile.TemporaryDirectory() as directory:
+        for sessions in SESSION_COUNTS:
+            store_path = os.path.join(directory, f"load-{sessions}.db")
+            elapsed, stats, saved = run(sessions, turns, transcribe, store_path, scale, workers, shared_tts)
+            lost = stats["done"] - saved
+            print(f"{sessions:>8} {elapsed:>9.2f} {sessions / elapsed * 60:>10.1f} "
+                  f"{stats['p50_seconds'] or 0:>8.2f}s {stats['p95_seconds'] or 0:>8.2f}s "
+                  f"{stats['failed']:>7} {lost:>5}")
+            failed = failed or stats["failed"] or lost
+    if failed:
+        print("FAILED: calls failed or records were lost.")
+        sys.exit(1)
+    print("OK: every call completed and was saved.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import os
+import sys
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from conversation_pipeline import ConversationPipeline
+
+# Shared helpers live in the repository root
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+from live_analysis import LiveAnalyzer
+
+
+class CallSession:
+    """State of one agent conversation.
+
+    The worker running the call updates it; the UI reads consistent copies
+    with `snapshot()` and never waits on the call itself.
+    """
+
+    def __init__(self, call_id, label="", max_messages=200):
+        self.id = call_id
+        self.label = label
+        self.max_messages = max_messages
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.messages = []
+        self.details = {}
+        self.complaint = None
+        self.live = None
+        self.live_analyzer = None
+        self.partial_analysis = ""
+        self.result = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    def log(self, message):
+        message = message.strip()
+        if not message:
+            return
+        with self._lock:
+            self.messages.append(message)
+            del self.messages[:-self.max_messages]
+
+    def update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def answer(self, field, text):
+        with self._lock:
+            if field == "complaint":
+                self.complaint = text
+            else:
+                self.details[field] = text
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def snapshot(self):
+        """Return a copy of the call's state as a dict."""
+        with self._lock:
+            return {
+                "id": self.id,
+                "label": self.label,
+                "status": self.status,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "messages": list(self.messages),
+                "details": dict(self.details),
+                "complaint": self.complaint,
+                "live": dict(self.live) if self.live else None,
+                "partial_analysis": self.partial_analysis,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class SessionManager:
+    """Runs many agent conversations at once on background threads.
+
+    Each call holds one of `max_calls` call threads for its prompt/capture
+    loop (the waits there are on audio I/O). Recognition, sentiment, analysis
+    and CRM saves of every call share one pool of `workers` threads, which
+    also bounds how many transcriptions hit the shared ASR model at once.
+    Calls beyond `max_calls` wait in the queue with status "queued".
+
+    `open_capture(**options)` returns a context manager yielding a capture
+    session (e.g. CaptureSession); `analyze(text, on_chunk)` streams the
+    analysis, calling `on_chunk(chunk, text_so_far)` as it arrives. `speak`,
+    `save` and `sentiment` are passed to ConversationPipeline. With `live`,
+    the complaint feeds a LiveAnalyzer while it is recorded.
+    """
+
+    def __init__(self, open_capture, speak, analyze, save=None, sentiment=None,
+                 max_calls=8, workers=4, keep_finished=100, live=True):
+        self.open_capture = open_capture
+        self.speak = speak
+        self.analyze = analyze
+        self.save = save
+        self.sentiment = sentiment
+        self.max_calls = max_calls
+        self.keep_finished = keep_finished
+        self.live = live
+        self._calls = ThreadPoolExecutor(max_calls, thread_name_prefix="call")
+        self._workers = ThreadPoolExecutor(workers, thread_name_prefix="call-worker")
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, label="", **capture_options):
+        """Queue a new conversation and return its CallSession immediately."""
+        call = CallSession(uuid.uuid4().hex[:8], label)
+        with self._lock:
+            self._sessions[call.id] = call
+            self._prune()
+        self._calls.submit(self._run, call, capture_options)
+        return call
+
+    def get(self, call_id):
+        with self._lock:
+            return self._sessions.get(call_id)
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def _prune(self):
+        finished = [call_id for call_id, call in self._sessions.items() if call.done]
+        for call_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._sessions[call_id]
+
+    def _run(self, call, capture_options):
+        call.update(status="running", started=time.time())
+        try:
+            with self.open_capture(**capture_options) as session:
+                pipeline = ConversationPipeline(
+                    session, self.speak,
+                    analyze=lambda text: self._analyze(call, text),
+                    save=self.save, sentiment=self.sentiment,
+                    executor=self._workers, log=call.log,
+                    on_answer=self._answer_hook(call),
+                    on_listen=self._listen_hook(call, session),
+                )
+                result = pipeline.run()
+            if result is None:
+                call.update(status="failed", error="The conversation could not be completed.", finished=time.time())
+            else:
+                call.update(status="done", result=result, finished=time.time())
+        except Exception as e:
+            call.log(f"Error: {e}")
+            call.update(status="failed", error=str(e), finished=time.time())
+
+    def _analyze(self, call, text):
+        def on_chunk(chunk, text_so_far):
+            call.update(partial_analysis=text_so_far)
+        return self.analyze(text, on_chunk)
+
+    def _listen_hook(self, call, session):
+        if not self.live:
+            return None
+
+        def on_listen(field):
+            if field != "complaint":
+                return None
+            call.live_analyzer = LiveAnalyzer(session.sample_rate, on_update=lambda state: call.update(live=state))
+            return call.live_analyzer.push_audio
+        return on_listen
+
+    def _answer_hook(self, call):
+        def on_answer(field, text):
+            call.answer(field, text)
+            if field == "complaint" and call.live_analyzer is not None:
+                call.live_analyzer.push_transcript(text, final=True)
+        return on_answer
+
+    def stats(self):
+        """Count calls by status and summarise the durations of finished calls."""
+        calls = self.sessions()
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for call in calls:
+            counts[call.status] += 1
+        durations = sorted(call.finished - call.started for call in calls
+                           if call.status == "done" and call.started and call.finished)
+
+        def percentile(q):
+            return durations[min(len(durations) - 1, int(q * len(durations)))] if durations else None
+        return dict(counts, p50_seconds=percentile(0.5), p95_seconds=percentile(0.95))
+
+    def shutdown(self, wait=True):
+        self._calls.shutdown(wait=wait)
+        self._workers.shutdown(wait=wait)
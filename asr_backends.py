@@ -0,0 +1,195 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+import speech_recognition as sr
+from audio_buffer import PcmBuffer
+
+# Sample rate the Whisper family of models expects
+WHISPER_RATE = 16000
+
+
+def audio_to_float32(audio, rate=WHISPER_RATE):
+    """Convert AudioData or a PcmBuffer to mono float32 samples in [-1, 1] at `rate`."""
+    if isinstance(audio, PcmBuffer):
+        return audio.as_float32(rate)
+    raw = audio.get_raw_data(convert_rate=rate, convert_width=2)
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+class SpeechRecognizer:
+    """Base class for speech-to-text backends.
+
+    `transcribe` takes speech_recognition AudioData or a PcmBuffer and returns
+    the text.
+    Like `Recognizer.recognize_google`, it raises sr.UnknownValueError when no
+    speech was recognized and sr.RequestError when the backend fails.
+    """
+
+    name = "base"
+
+    def transcribe(self, audio):
+        raise NotImplementedError
+
+    def _check(self, text):
+        text = text.strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class GoogleRecognizer(SpeechRecognizer):
+    """Google Web Speech API (network round trip per utterance)."""
+
+    name = "google"
+
+    def __init__(self, language="en-US"):
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def transcribe(self, audio):
+        if isinstance(audio, PcmBuffer):
+            audio = audio.to_audio_data()
+        return self.recognizer.recognize_google(audio, language=self.language)
+
+
+class WhisperRecognizer(SpeechRecognizer):
+    """Local OpenAI Whisper model, loaded once per process."""
+
+    name = "whisper"
+
+    def __init__(self, model_size="base", device="cpu"):
+        import whisper
+        self.model = whisper.load_model(model_size, device=device)
+        self.fp16 = device != "cpu"
+
+    def transcribe(self, audio):
+        samples = audio if isinstance(audio, np.ndarray) else audio_to_float32(audio)
+        try:
+            result = self.model.transcribe(samples, fp16=self.fp16)
+        except Exception as e:
+            raise sr.RequestError(f"Whisper transcription failed: {e}")
+        return self._check(result["text"])
+
+
+class FasterWhisperRecognizer(SpeechRecognizer):
+    """Local Whisper via CTranslate2 (faster-whisper), int8-quantized on CPU by default."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size="base.en", device="cpu", compute_type="int8", cpu_threads=0):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def transcribe(self, audio):
+        samples = audio if isinstance(audio, np.ndarray) else audio_to_float32(audio)
+        try:
+            segments, _ = self.model.transcribe(samples, beam_size=1, vad_filter=True)
+            text = "".join(segment.text for segment in segments)
+        except Exception as e:
+            raise sr.RequestError(f"faster-whisper transcription failed: {e}")
+        return self._check(text)
+
+
+class ServerRecognizer(SpeechRecognizer):
+    """Whisper running in the shared model server (see model_server.py)."""
+
+    name = "server"
+
+    def __init__(self, model="whisper", address=None):
+        from model_server import ModelClient, DEFAULT_ADDRESS
+        self.client = ModelClient(address or DEFAULT_ADDRESS)
+        self.model = model
+
+    def transcribe(self, audio):
+        try:
+            text = self.client.transcribe(audio, self.model)
+        except (OSError, RuntimeError) as e:
+            raise sr.RequestError(f"Model server transcription failed: {e}")
+        return self._check(text)
+
+
+BACKENDS = {
+    "server": ServerRecognizer,
+    "faster-whisper": FasterWhisperRecognizer,
+    "whisper": WhisperRecognizer,
+    "google": GoogleRecognizer,
+}
+
+# Local CPU engines first; Google is only used if no local engine is installed
+DEFAULT_ORDER = ["faster-whisper", "whisper", "google"]
+
+_recognizers = {}
+_lock = threading.Lock()
+
+
+def get_recognizer(name=None, **options):
+    """Return a shared recognizer for backend `name`, loading its model only once.
+
+    Without `name`, the `ASR_BACKEND` environment variable is used, and failing
+    that the first local backend that is installed.
+    """
+    name = name or os.environ.get("ASR_BACKEND")
+    candidates = [name] if name else DEFAULT_ORDER
+    # The default is resolved once; later calls skip the backends that failed to import
+    default_key = (None, tuple(sorted(options.items())))
+    with _lock:
+        if not name and default_key in _recognizers:
+            return _recognizers[default_key]
+        for candidate in candidates:
+            key = (candidate, tuple(sorted(options.items())))
+            if key in _recognizers:
+                if not name:
+                    _recognizers[default_key] = _recognizers[key]
+                return _recognizers[key]
+            if candidate not in BACKENDS:
+                raise ValueError(f"Unknown ASR backend: {candidate}")
+            try:
+                recognizer = BACKENDS[candidate](**options)
+            except ImportError as e:
+                if name:
+                    raise
+                print(f"ASR backend '{candidate}' is not available ({e}), trying the next one.")
+                continue
+            _recognizers[key] = recognizer
+            if not name:
+                _recognizers[default_key] = recognizer
+            return recognizer
+    raise RuntimeError("No speech recognition backend is available.")
+
+
+def benchmark(wav_path, backends=None, runs=3):
+    """Print the real-time factor (processing time / audio duration) of each backend."""
+    with sr.AudioFile(wav_path) as source:
+        audio = sr.Recognizer().record(source)
+    duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+
+    for name in backends or list(BACKENDS):
+        start = time.perf_counter()
+        try:
+            recognizer = get_recognizer(name)
+        except Exception as e:
+            print(f"{name:>15}: unavailable ({e})")
+            continue
+        load_time = time.perf_counter() - start
+
+        timings = []
+        text = ""
+        for _ in range(runs):
+            start = time.perf_counter()
+            try:
+                text = recognizer.transcribe(audio)
+            except (sr.UnknownValueError, sr.RequestError) as e:
+                text = f"<{type(e).__name__}>"
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{name:>15}: load {load_time:.2f}s, best {best:.2f}s, RTF {best / duration:.3f} -> {text[:60]!r}")
+
+
+if __name__ == "__main__":
+    # Usage: python asr_backends.py file.wav [backend ...]
+    if len(sys.argv) < 2:
+        print("Usage: python asr_backends.py file.wav [backend ...]")
+        sys.exit(1)
+    benchmark(sys.argv[1], sys.argv[2:] or None)
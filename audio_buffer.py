@@ -0,0 +1,72 @@
+import numpy as np
+import speech_recognition as sr
+
+
+class PcmBuffer:
+    """Raw little-endian PCM audio held in memory.
+
+    Wraps the captured bytes without copying them: `samples` is a NumPy view
+    over the same memory, so the buffer can go straight to tone analysis, ASR
+    and Whisper without a temporary WAV file.
+    """
+
+    def __init__(self, data, sample_rate, sample_width=2, channels=1):
+        if sample_width != 2:
+            raise ValueError("PcmBuffer only supports 16-bit PCM")
+        self.data = data
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+
+    @classmethod
+    def from_audio_data(cls, audio):
+        """Wrap speech_recognition AudioData (converted to 16-bit if needed)."""
+        if audio.sample_width == 2:
+            data = audio.frame_data
+        else:
+            data = audio.get_raw_data(convert_width=2)
+        return cls(data, audio.sample_rate, 2)
+
+    @classmethod
+    def from_ndarray(cls, samples, sample_rate):
+        """Wrap an int16 array of shape (frames,) or (frames, channels) without copying."""
+        samples = np.ascontiguousarray(samples, dtype=np.int16)
+        channels = 1 if samples.ndim == 1 else samples.shape[1]
+        return cls(memoryview(samples).cast("B"), sample_rate, 2, channels)
+
+    @property
+    def samples(self):
+        """int16 view over the buffer, shape (frames,) or (frames, channels)."""
+        samples = np.frombuffer(self.data, dtype=np.int16)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels)
+        return samples
+
+    @property
+    def duration(self):
+        return len(self.data) / (self.sample_rate * self.sample_width * self.channels)
+
+    def mono(self):
+        """Return a single-channel buffer (the buffer itself if already mono)."""
+        if self.channels == 1:
+            return self
+        mixed = self.samples.astype(np.int32).mean(axis=1).astype(np.int16)
+        return PcmBuffer.from_ndarray(mixed, self.sample_rate)
+
+    def as_float32(self, sample_rate=None):
+        """Mono float32 samples in [-1, 1], resampled to `sample_rate` if given.
+
+        This is the input format Whisper expects (at 16 kHz).
+        """
+        samples = self.mono().samples.astype(np.float32) / 32768.0
+        if sample_rate and sample_rate != self.sample_rate:
+            target_length = int(round(len(samples) * sample_rate / self.sample_rate))
+            positions = np.linspace(0, len(samples) - 1, target_length)
+            samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+        return samples
+
+    def to_audio_data(self):
+        """Return speech_recognition AudioData for APIs that need it (e.g. Google)."""
+        buffer = self.mono()
+        data = buffer.data if isinstance(buffer.data, bytes) else bytes(buffer.data)
+        return sr.AudioData(data, buffer.sample_rate, buffer.sample_width)
@@ -0,0 +1,189 @@
+import os
+import gc
+import sys
+import time
+import numpy as np
+from model_server import rss_bytes
+
+# CPU inference modes: plain fp32, dynamic int8 quantization, fp32 under
+# torch.compile, or an ONNX Runtime export (needs `pip install optimum[onnxruntime]`)
+CPU_MODES = ["fp32", "int8", "compile", "onnx"]
+
+BENCHMARK_PROMPTS = [
+    "Today is a good day",
+    "The customer called because their order",
+    "Q: How do I reset my password?\nA:",
+    "Our new product line is designed to",
+    "The best way to handle an angry caller is",
+]
+
+
+def physical_cores():
+    try:
+        import psutil
+        return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+    except ImportError:
+        return os.cpu_count() or 1
+
+
+def configure_threads(num_threads=None):
+    """Set PyTorch's intra-op threads (default: LLM_THREADS or the number of physical cores).
+
+    Hyperthreads don't help matrix multiplies, and inter-op parallelism is
+    kept at one thread since generation runs one op after another.
+    """
+    import torch
+    num_threads = int(num_threads or os.environ.get("LLM_THREADS", 0)) or physical_cores()
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Can only be set once, before any parallel work has started
+        pass
+    return num_threads
+
+
+def conv1d_to_linear(model):
+    """Replace GPT-2's Conv1D layers with equivalent nn.Linear layers, in place.
+
+    GPT-2 stores its projections as transformers' Conv1D (weight shaped
+    in x out), which dynamic quantization doesn't recognise.
+    """
+    import torch
+    from torch import nn
+    try:
+        from transformers.pytorch_utils import Conv1D
+    except ImportError:
+        from transformers.modeling_utils import Conv1D
+
+    for name, child in model.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                linear.bias.copy_(child.bias)
+            setattr(model, name, linear)
+        else:
+            conv1d_to_linear(child)
+    return model
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every linear layer (weights int8, activations quantized on the fly)."""
+    import torch
+    from torch import nn
+    conv1d_to_linear(model)
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def load_cpu_model(model_name="gpt2-medium", mode="int8", num_threads=None):
+    """Load a causal LM for CPU inference in one of CPU_MODES; returns (model, tokenizer)."""
+    if mode not in CPU_MODES:
+        raise ValueError(f"Unknown CPU mode {mode!r}; choose from {', '.join(CPU_MODES)}")
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    configure_threads(num_threads)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.pad_token = tokenizer.eos_token
+
+    if mode == "onnx":
+        from optimum.onnxruntime import ORTModelForCausalLM
+        model = ORTModelForCausalLM.from_pretrained(model_name, export=True, use_cache=True)
+    else:
+        model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.float32).eval()
+        if mode == "int8":
+            model = quantize_int8(model)
+        elif mode == "compile":
+            model.forward = torch.compile(model.forward, dynamic=True)
+    model.config.pad_token_id = tokenizer.pad_token_id
+    return model, tokenizer
+
+
+def _generate(model, tokenizer, prompts, max_new_tokens):
+    """Greedy generation for each prompt; returns (new token ids per prompt, latencies)."""
+    import torch
+    outputs, latencies = [], []
+    for prompt in prompts:
+        inputs = tokenizer(prompt, return_tensors="pt")
+        start = time.perf_counter()
+        with torch.inference_mode():
+            result = model.generate(**inputs, max_new_tokens=max_new_tokens, do_sample=False,
+                                    no_repeat_ngram_size=2, pad_token_id=tokenizer.pad_token_id)
+        latencies.append(time.perf_counter() - start)
+        outputs.append(result[0][inputs["input_ids"].shape[1]:].tolist())
+    return outputs, latencies
+
+
+def _next_token_logits(model, tokenizer, prompts):
+    import torch
+    logits = []
+    with torch.inference_mode():
+        for prompt in prompts:
+            inputs = tokenizer(prompt, return_tensors="pt")
+            logits.append(np.asarray(model(**inputs).logits[0, -1].float().numpy(), dtype=np.float64))
+    return logits
+
+
+def _common_prefix(a, b):
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+def benchmark(model_name="gpt2-medium", modes=None, prompts=None, max_new_tokens=40, num_threads=None):
+    """Compare load time, memory, throughput and output drift of each CPU mode against fp32."""
+    modes = modes or ["fp32", "int8"]
+    if "fp32" not in modes:
+        modes = ["fp32"] + modes
+    prompts = prompts or BENCHMARK_PROMPTS
+    print(f"{model_name}, {len(prompts)} prompts x {max_new_tokens} new tokens, "
+          f"{configure_threads(num_threads)} threads")
+
+    reference = None
+    for mode in modes:
+        before = rss_bytes()
+        start = time.perf_counter()
+        try:
+            model, tokenizer = load_cpu_model(model_name, mode, num_threads)
+        except ImportError as e:
+            print(f"{mode:>8}: unavailable ({e})")
+            continue
+        load_time = time.perf_counter() - start
+        after = rss_bytes()
+        memory = f"{(after - before) / 2 ** 20:.0f} MB" if before is not None and after is not None else "n/a"
+
+        # One untimed run so lazy initialisation and compilation don't count
+        _generate(model, tokenizer, prompts[:1], 4)
+        outputs, latencies = _generate(model, tokenizer, prompts, max_new_tokens)
+        tokens = sum(len(output) for output in outputs)
+        logits = _next_token_logits(model, tokenizer, prompts)
+
+        line = (f"{mode:>8}: load {load_time:.1f}s, +{memory}, {tokens / sum(latencies):.1f} tokens/s, "
+                f"p50 {np.percentile(latencies, 50) * 1000:.0f} ms")
+        if reference is None:
+            reference = (outputs, logits)
+        else:
+            ref_outputs, ref_logits = reference
+            exact = np.mean([a == b for a, b in zip(outputs, ref_outputs)])
+            agreement = np.mean([_common_prefix(a, b) / max(len(b), 1) for a, b in zip(outputs, ref_outputs)])
+            logit_drift = np.mean([np.abs(a - b).max() for a, b in zip(logits, ref_logits)])
+            top1 = np.mean([a.argmax() == b.argmax() for a, b in zip(logits, ref_logits)])
+            line += (f" | drift vs fp32: {exact:.0%} identical outputs, {agreement:.0%} tokens before divergence, "
+                     f"next-token top-1 {top1:.0%}, max |logit diff| {logit_drift:.3f}")
+        print(line)
+        del model
+        gc.collect()
+
+
+if __name__ == "__main__":
+    # Usage: python cpu_inference.py [model] [mode ...]
+    # e.g.   python cpu_inference.py gpt2-medium fp32 int8 compile onnx
+    benchmark(
+        sys.argv[1] if len(sys.argv) > 1 else "gpt2-medium",
+        sys.argv[2:] or None,
+    )
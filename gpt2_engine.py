@@ -0,0 +1,466 @@
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import Future
+import numpy as np
+
+# Few-shot preamble of the voice assistant; its keys/values are computed once
+QA_PREFIX = (
+    "You are an assistant that answers questions concisely.\n"
+    "Q: What is your name?\n"
+    "A: My name is GPT-2.\n"
+)
+
+# The model starts a new question once it has answered this one
+QA_STOP = ("Q:",)
+
+DECODING_MODES = ["greedy", "beam", "sample"]
+
+
+def qa_suffix(question):
+    """The per-question part of the assistant prompt (follows QA_PREFIX)."""
+    return f"Q: {question}\nA:"
+
+
+class DecodingConfig:
+    """How new tokens are chosen and when generation stops.
+
+    - "greedy" takes the most likely token;
+    - "beam" keeps `num_beams` hypotheses (with early stopping);
+    - "sample" samples with `temperature`, `top_k` and `top_p`.
+
+    Only the settings of the chosen mode are used. `max_new_tokens` counts
+    generated tokens only, so a long prompt doesn't eat the answer's budget,
+    and generation ends as soon as the new text contains one of `stop`.
+    """
+
+    def __init__(self, mode="greedy", max_new_tokens=40, no_repeat_ngram_size=2, stop=(),
+                 num_beams=4, temperature=0.7, top_k=50, top_p=0.9):
+        if mode not in DECODING_MODES:
+            raise ValueError(f"Unknown decoding mode {mode!r}; choose from {', '.join(DECODING_MODES)}")
+        self.mode = mode
+        self.max_new_tokens = max_new_tokens
+        self.no_repeat_ngram_size = no_repeat_ngram_size
+        self.stop = tuple(stop)
+        self.num_beams = num_beams
+        self.temperature = temperature
+        self.top_k = top_k
+        self.top_p = top_p
+
+    def as_dict(self):
+        return dict(vars(self), stop=list(self.stop))
+
+    def key(self):
+        """Hashable identity, so requests with the same settings can share a batch."""
+        return tuple(sorted((name, tuple(value) if isinstance(value, list) else value)
+                            for name, value in self.as_dict().items()))
+
+    def generate_kwargs(self):
+        """Arguments for Hugging Face `model.generate` that match this config."""
+        kwargs = {"max_new_tokens": self.max_new_tokens, "no_repeat_ngram_size": self.no_repeat_ngram_size}
+        if self.mode == "greedy":
+            kwargs.update(do_sample=False, num_beams=1)
+        elif self.mode == "beam":
+            kwargs.update(do_sample=False, num_beams=self.num_beams, early_stopping=True)
+        else:
+            kwargs.update(do_sample=True, temperature=self.temperature, top_k=self.top_k, top_p=self.top_p)
+        return kwargs
+
+
+def cut_at_stop(text, stop):
+    """Return (text before the first stop sequence, whether one was found)."""
+    positions = [text.find(s) for s in stop if s in text]
+    if not positions:
+        return text, False
+    return text[:min(positions)], True
+
+
+def _stop_criteria(tokenizer, prompt_length, stop):
+    """A StoppingCriteria that ends each sequence once its new text contains a stop sequence."""
+    import torch
+    from transformers import StoppingCriteria, StoppingCriteriaList
+
+    class StopOnText(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            done = [cut_at_stop(tokenizer.decode(row[prompt_length:], skip_special_tokens=True), stop)[1]
+                    for row in input_ids]
+            return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    return StoppingCriteriaList([StopOnText()])
+
+
+def generate_text(model, tokenizer, prompt, config, device=None):
+    """Run `model.generate` on one prompt with `config`; returns the new text only.
+
+    Returns {"text", "tokens", "stopped", "tokens_avoided"}: `tokens_avoided`
+    is how much of the budget was left when a stop sequence ended generation.
+    """
+    import torch
+    inputs = tokenizer(prompt, return_tensors="pt")
+    if device is not None:
+        inputs = inputs.to(device)
+    prompt_length = inputs["input_ids"].shape[1]
+    kwargs = config.generate_kwargs()
+    if config.stop:
+        kwargs["stopping_criteria"] = _stop_criteria(tokenizer, prompt_length, config.stop)
+    with torch.inference_mode():
+        outputs = model.generate(**inputs, pad_token_id=tokenizer.eos_token_id, **kwargs)
+    new_tokens = outputs[0][prompt_length:]
+    text, stopped = cut_at_stop(tokenizer.decode(new_tokens, skip_special_tokens=True), config.stop)
+    return {
+        "text": text,
+        "tokens": len(new_tokens),
+        "stopped": stopped,
+        "tokens_avoided": config.max_new_tokens - len(new_tokens) if stopped else 0,
+    }
+
+
+def _legacy_cache(past):
+    """past_key_values as a tuple of (key, value) pairs, whatever the transformers version."""
+    return past.to_legacy_cache() if hasattr(past, "to_legacy_cache") else past
+
+
+def _cache_for_model(past):
+    # Recent transformers versions want a Cache object rather than tuples
+    try:
+        from transformers import DynamicCache
+    except ImportError:
+        return past
+    return DynamicCache.from_legacy_cache(past) if hasattr(DynamicCache, "from_legacy_cache") else past
+
+
+class _Request:
+    def __init__(self, text, config):
+        self.text = text
+        self.config = config
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class Gpt2Engine:
+    """GPT-2 generation with a cached prompt prefix and dynamic batching.
+
+    The static `prefix` (e.g. the few-shot preamble) is run through the model
+    once and its past_key_values are kept; every request only encodes its own
+    suffix on top of them. The prefix should end on a token boundary, such as
+    a newline.
+
+    `generate_batch` runs many suffixes together: they are left-padded so
+    their last tokens line up, with the padding masked out and position ids
+    continuing from the prefix. `submit`/`generate` put single requests on a
+    queue; a worker thread gathers up to `max_batch_size` of them (waiting at
+    most `max_wait` seconds after the first) into one batch.
+
+    Greedy and sampling decode in that batched loop. Beam search goes through
+    `model.generate` one prompt at a time, without the prefix cache.
+    """
+
+    def __init__(self, model_name="gpt2", prefix="", model=None, tokenizer=None, device=None,
+                 max_batch_size=8, max_wait=0.02, decoding=None):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+        self._torch = torch
+        self.device = device or torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.tokenizer = tokenizer or AutoTokenizer.from_pretrained(model_name)
+        self.model = (model or AutoModelForCausalLM.from_pretrained(model_name)).to(self.device).eval()
+        self.eos_id = self.tokenizer.eos_token_id
+        self.max_positions = self.model.config.n_positions
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.decoding = decoding or DecodingConfig()
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.tokens_generated = 0
+        self.tokens_avoided = 0
+        self.stopped_early = 0
+        self.busy_seconds = 0.0
+        self.batches = 0
+        self.set_prefix(prefix)
+
+    def set_prefix(self, prefix):
+        """Encode `prefix` once and keep its keys/values for every later request."""
+        torch = self._torch
+        self.prefix = prefix
+        self.prefix_ids = self.tokenizer(prefix)["input_ids"] if prefix else []
+        self._prefix_past = None
+        if self.prefix_ids:
+            with torch.inference_mode():
+                out = self.model(torch.tensor([self.prefix_ids], device=self.device), use_cache=True)
+            self._prefix_past = tuple((key, value) for key, value in _legacy_cache(out.past_key_values))
+
+    def _batched_prefix(self, batch_size):
+        # expand() shares the prefix tensors across the batch without copying
+        if self._prefix_past is None:
+            return None
+        return _cache_for_model(tuple(
+            (key.expand(batch_size, -1, -1, -1), value.expand(batch_size, -1, -1, -1))
+            for key, value in self._prefix_past
+        ))
+
+    @staticmethod
+    def _banned_tokens(n, seen, history):
+        """Tokens that would repeat an n-gram already in `history`."""
+        if n <= 0 or len(history) < n - 1:
+            return ()
+        return seen.get(tuple(history[len(history) - n + 1:]), ())
+
+    @staticmethod
+    def _remember_ngram(n, seen, history):
+        if n > 0 and len(history) >= n:
+            seen.setdefault(tuple(history[-n:-1]), set()).add(history[-1])
+
+    def _choose(self, logits, config):
+        """Pick the next token of every row according to `config.mode`."""
+        torch = self._torch
+        if config.mode != "sample":
+            return logits.argmax(dim=-1).tolist()
+        logits = logits / max(config.temperature, 1e-5)
+        if config.top_k:
+            kth = torch.topk(logits, min(config.top_k, logits.shape[-1]), dim=-1).values[:, -1:]
+            logits = logits.masked_fill(logits < kth, float("-inf"))
+        if config.top_p < 1.0:
+            sorted_logits, order = logits.sort(dim=-1, descending=True)
+            cumulative = sorted_logits.softmax(dim=-1).cumsum(dim=-1)
+            # Drop tokens once the probability mass before them already exceeds top_p
+            drop = cumulative - sorted_logits.softmax(dim=-1) > config.top_p
+            logits = logits.scatter(1, order, sorted_logits.masked_fill(drop, float("-inf")))
+        return torch.multinomial(logits.softmax(dim=-1), 1).squeeze(1).tolist()
+
+    def generate_batch(self, texts, decoding=None):
+        """Generate a completion for every suffix in `texts`; returns only the new text.
+
+        Returns a list of {"text", "tokens", "stopped", "tokens_avoided"}
+        dicts in input order (see `generate_text`).
+        """
+        config = decoding or self.decoding
+        if config.mode == "beam":
+            return [generate_text(self.model, self.tokenizer, self.prefix + text, config, self.device)
+                    for text in texts]
+
+        torch = self._torch
+        budget = config.max_new_tokens
+        ngram = config.no_repeat_ngram_size
+        prefix_length = len(self.prefix_ids)
+        room = self.max_positions - prefix_length - budget
+        encoded = [self.tokenizer(text)["input_ids"][-room:] for text in texts]
+        width = max(len(ids) for ids in encoded)
+        batch_size = len(texts)
+
+        # Left-pad so every suffix ends in the last column
+        pad = self.eos_id
+        input_ids = [[pad] * (width - len(ids)) + ids for ids in encoded]
+        attention = [[1] * prefix_length + [0] * (width - len(ids)) + [1] * len(ids) for ids in encoded]
+        positions = [[prefix_length] * (width - len(ids)) + list(range(prefix_length, prefix_length + len(ids)))
+                     for ids in encoded]
+
+        histories = [self.prefix_ids + ids for ids in encoded]
+        seen = [{} for _ in texts]
+        for i, history in enumerate(histories):
+            for end in range(ngram, len(history) + 1):
+                self._remember_ngram(ngram, seen[i], history[:end])
+
+        input_ids = torch.tensor(input_ids, device=self.device)
+        attention = torch.tensor(attention, device=self.device)
+        positions = torch.tensor(positions, device=self.device)
+        past = self._batched_prefix(batch_size)
+        generated = [[] for _ in texts]
+        results = [None] * batch_size
+        finished = [budget <= 0] * batch_size
+
+        with torch.inference_mode():
+            while not all(finished):
+                out = self.model(input_ids=input_ids, attention_mask=attention, position_ids=positions,
+                                 past_key_values=past, use_cache=True)
+                past = out.past_key_values
+                logits = out.logits[:, -1, :]
+                for i in range(batch_size):
+                    banned = self._banned_tokens(ngram, seen[i], histories[i])
+                    if banned and not finished[i]:
+                        logits[i, list(banned)] = float("-inf")
+                next_tokens = self._choose(logits, config)
+
+                for i, token in enumerate(next_tokens):
+                    if finished[i]:
+                        next_tokens[i] = pad
+                        continue
+                    if token == self.eos_id:
+                        finished[i] = True
+                        continue
+                    generated[i].append(token)
+                    histories[i].append(token)
+                    self._remember_ngram(ngram, seen[i], histories[i])
+                    if config.stop:
+                        text, stopped = cut_at_stop(self.tokenizer.decode(generated[i], skip_special_tokens=True),
+                                                    config.stop)
+                        if stopped:
+                            finished[i] = True
+                            results[i] = {"text": text, "tokens": len(generated[i]), "stopped": True,
+                                          "tokens_avoided": budget - len(generated[i])}
+                            continue
+                    if len(generated[i]) >= budget:
+                        finished[i] = True
+
+                input_ids = torch.tensor([[token] for token in next_tokens], device=self.device)
+                attention = torch.cat([attention, attention.new_ones((batch_size, 1))], dim=1)
+                positions = positions[:, -1:] + 1
+
+        return [result or {"text": self.tokenizer.decode(tokens, skip_special_tokens=True), "tokens": len(tokens),
+                           "stopped": False, "tokens_avoided": 0}
+                for result, tokens in zip(results, generated)]
+
+    def submit(self, text, decoding=None):
+        """Queue one request for dynamic batching; returns a Future of the result dict."""
+        request = _Request(text, decoding or self.decoding)
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        self._queue.put(request)
+        return request.future
+
+    def generate(self, text, decoding=None):
+        """Generate one completion (batched with any concurrent requests)."""
+        return self.submit(text, decoding).result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Requests only share a forward pass if they decode the same way
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.config.key(), []).append(request)
+            for group in groups.values():
+                self._run_group(group)
+
+    def _run_group(self, batch):
+        start = time.perf_counter()
+        try:
+            results = self.generate_batch([r.text for r in batch], batch[0].config)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        done = time.perf_counter()
+        with self._lock:
+            self.busy_seconds += done - start
+            self.batches += 1
+            for request, result in zip(batch, results):
+                self.tokens_generated += result["tokens"]
+                self.tokens_avoided += result["tokens_avoided"]
+                self.stopped_early += result["stopped"]
+                self.latencies.append(done - request.submitted)
+        for request, result in zip(batch, results):
+            request.future.set_result(result)
+
+    def stats(self):
+        """Tokens/sec, latency percentiles and tokens saved by stop sequences since the engine started."""
+        with self._lock:
+            latencies = np.array(self.latencies)
+            return {
+                "requests": len(latencies),
+                "batches": self.batches,
+                "tokens": self.tokens_generated,
+                "tokens_per_second": self.tokens_generated / self.busy_seconds if self.busy_seconds else 0.0,
+                "p50_latency": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "p99_latency": float(np.percentile(latencies, 99)) if len(latencies) else None,
+                "stopped_early": self.stopped_early,
+                "tokens_avoided_per_request": self.tokens_avoided / len(latencies) if len(latencies) else 0.0,
+            }
+
+
+def report(name, tokens, elapsed, latencies):
+    latencies = np.array(latencies)
+    print(f"{name}: {len(latencies)} prompts, {tokens} tokens in {elapsed:.2f}s -> {tokens / elapsed:.1f} tokens/s, "
+          f"p50 {np.percentile(latencies, 50) * 1000:.0f} ms, p99 {np.percentile(latencies, 99) * 1000:.0f} ms")
+
+
+def _read_prompts(path):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_prompt_file(path, engine, template="{}", decoding=None):
+    """Submit every line of `path` (formatted with `template`) at once and print the results and stats."""
+    prompts = _read_prompts(path)
+
+    start = time.perf_counter()
+    futures = [engine.submit(template.format(prompt), decoding) for prompt in prompts]
+    results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    for prompt, result in zip(prompts, results):
+        print(f"{prompt!r} -> {result['text'].strip()!r}")
+    stats = engine.stats()
+    report(f"engine (batch {engine.max_batch_size})", stats["tokens"], elapsed, engine.latencies)
+    if (decoding or engine.decoding).stop:
+        print(f"stop sequences ended {stats['stopped_early']} of {stats['requests']} requests early, "
+              f"avoiding {stats['tokens_avoided_per_request']:.1f} tokens per request")
+    return results
+
+
+def baseline(path, engine, template="{}", decoding=None):
+    """The old way: one model.generate call per prompt over the full, re-encoded prompt, run to the full budget.
+
+    Also counts the tokens generated after the stop sequence, i.e. the ones
+    the old loop produced only to throw away.
+    """
+    torch = engine._torch
+    config = decoding or engine.decoding
+    kwargs = config.generate_kwargs()
+    prompts = _read_prompts(path)
+
+    tokens = 0
+    wasted = 0
+    latencies = []
+    start = time.perf_counter()
+    for prompt in prompts:
+        inputs = engine.tokenizer(engine.prefix + template.format(prompt), return_tensors="pt").to(engine.device)
+        with torch.inference_mode():
+            outputs = engine.model.generate(**inputs, pad_token_id=engine.eos_id, **kwargs)
+        new_tokens = outputs[0][inputs["input_ids"].shape[1]:].tolist()
+        tokens += len(new_tokens)
+        if config.stop:
+            for used in range(1, len(new_tokens) + 1):
+                if cut_at_stop(engine.tokenizer.decode(new_tokens[:used]), config.stop)[1]:
+                    wasted += len(new_tokens) - used
+                    break
+        # Sequential requests queue behind each other, so latency counts from the start
+        latencies.append(time.perf_counter() - start)
+    report("baseline (one generate per prompt)", tokens, time.perf_counter() - start, latencies)
+    if config.stop:
+        print(f"baseline generated {wasted / len(prompts):.1f} tokens per request past the stop sequence")
+
+
+if __name__ == "__main__":
+    # Usage: python gpt2_engine.py questions.txt [model] [batch_size] [max_new_tokens] [mode] [compare]
+    # Each line is a question for the voice assistant's few-shot prompt; mode is greedy,
+    # beam or sample. Add "compare" to also time the old one-request-at-a-time generate loop.
+    if len(sys.argv) < 2:
+        print("Usage: python gpt2_engine.py questions.txt [model] [batch_size] [max_new_tokens] [mode] [compare]")
+        sys.exit(1)
+    decoding = DecodingConfig(
+        sys.argv[5] if len(sys.argv) > 5 else "greedy",
+        max_new_tokens=int(sys.argv[4]) if len(sys.argv) > 4 else 40,
+        stop=QA_STOP,
+    )
+    engine = Gpt2Engine(
+        sys.argv[2] if len(sys.argv) > 2 else "gpt2",
+        prefix=QA_PREFIX,
+        max_batch_size=int(sys.argv[3]) if len(sys.argv) > 3 else 8,
+        decoding=decoding,
+    )
+    run_prompt_file(sys.argv[1], engine, qa_suffix("{}"))
+    if "compare" in sys.argv[6:]:
+        baseline(sys.argv[1], engine, qa_suffix("{}"))
@@ -0,0 +1,127 @@
+import time
+import numpy as np
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from tone_features import extract_features, classify_tone
+
+
+class StreamingToneAnalyzer:
+    """Rolling tone estimate over the last `window_seconds` of audio.
+
+    Audio is pushed in chunks as it is captured; only a fixed-size window of
+    samples is kept, so memory stays bounded however long the caller talks.
+    Pushing only stores samples; the features are recomputed once every
+    `hop_seconds` of audio, so the capture loop calling `push` never falls
+    behind the microphone.
+    """
+
+    def __init__(self, sample_rate, window_seconds=3.0, hop_seconds=0.25):
+        self.sample_rate = sample_rate
+        self._window = np.zeros(int(sample_rate * window_seconds), dtype=np.int16)
+        self._filled = 0
+        self._hop = max(1, int(sample_rate * hop_seconds))
+        self._since_estimate = 0
+        self.tone = "Neutral"
+        self.summary = {}
+
+    def push(self, chunk):
+        """Add raw 16-bit PCM bytes (or an int16 array); refreshes the estimate once per hop."""
+        samples = np.frombuffer(chunk, dtype=np.int16) if isinstance(chunk, (bytes, bytearray, memoryview)) else chunk
+        samples = samples[-len(self._window):]
+        shift = len(samples)
+        if shift == 0:
+            return self.tone
+        self._window[:-shift or None] = self._window[shift:]
+        self._window[-shift:] = samples
+        self._filled = min(len(self._window), self._filled + shift)
+        self._since_estimate += shift
+        if self._since_estimate < self._hop:
+            return self.tone
+        return self.estimate()
+
+    def estimate(self):
+        """Recompute the tone from the samples currently in the window."""
+        if self._filled < self.sample_rate * 0.25:
+            return self.tone
+        self._since_estimate = 0
+        features = extract_features(self._window[-self._filled:], self.sample_rate)
+        self.summary = {key: value for key, value in features.items() if not isinstance(value, np.ndarray)}
+        self.tone = classify_tone(self.summary)
+        return self.tone
+
+
+class StreamingSentimentAnalyzer:
+    """Rolling sentiment from partial transcripts.
+
+    Each partial transcript is scored with VADER (only its last `max_chars`
+    characters) and blended into an exponential moving average, so the
+    estimate moves smoothly while the caller is still mid-sentence.
+    """
+
+    def __init__(self, smoothing=0.5, max_chars=500):
+        self.analyzer = SentimentIntensityAnalyzer()
+        self.smoothing = smoothing
+        self.max_chars = max_chars
+        self.reset()
+
+    def reset(self):
+        """Forget the previous utterance."""
+        self.compound = 0.0
+        self._last_text = ""
+        self._updates = 0
+
+    def update(self, text):
+        """Score a partial (or final) transcript and return the smoothed label."""
+        text = text.strip()[-self.max_chars:]
+        if text and text != self._last_text:
+            score = self.analyzer.polarity_scores(text)["compound"]
+            if self._updates == 0:
+                self.compound = score
+            else:
+                self.compound = self.smoothing * score + (1 - self.smoothing) * self.compound
+            self._last_text = text
+            self._updates += 1
+        return self.label
+
+    @property
+    def label(self):
+        if self.compound >= 0.05:
+            return "Positive"
+        if self.compound <= -0.05:
+            return "Negative"
+        return "Neutral"
+
+
+class LiveAnalyzer:
+    """Combines rolling tone and sentiment and reports changes to a callback.
+
+    `on_update(state)` is called at most every `min_interval` seconds with a
+    dict holding "tone", "sentiment" and "compound".
+    """
+
+    def __init__(self, sample_rate, on_update=None, min_interval=0.25):
+        self.tone = StreamingToneAnalyzer(sample_rate)
+        self.sentiment = StreamingSentimentAnalyzer()
+        self.on_update = on_update
+        self.min_interval = min_interval
+        self._last_report = 0.0
+
+    def push_audio(self, chunk):
+        self.tone.push(chunk)
+        self._report()
+
+    def push_transcript(self, text, final=False):
+        self.sentiment.update(text)
+        self._report(force=final)
+
+    def state(self):
+        return {
+            "tone": self.tone.tone,
+            "sentiment": self.sentiment.label,
+            "compound": self.sentiment.compound,
+        }
+
+    def _report(self, force=False):
+        now = time.monotonic()
+        if self.on_update is not None and (force or now - self._last_report >= self.min_interval):
+            self._last_report = now
+            self.on_update(self.state())
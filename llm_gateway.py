@@ -0,0 +1,466 @@
+import sys
+import time
+import json
+import random
+import asyncio
+import threading
+import numpy as np
+
+
+class ProviderError(Exception):
+    """A provider call failed; `retryable` says whether trying again may help."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class LlmResult:
+    def __init__(self, text, provider, latency, attempts=1, hedged=False):
+        self.text = text
+        self.provider = provider
+        self.latency = latency
+        self.attempts = attempts
+        self.hedged = hedged
+
+    def __repr__(self):
+        return f"LlmResult(provider={self.provider!r}, latency={self.latency:.2f}s, text={self.text[:40]!r})"
+
+
+def as_messages(prompt, system=None):
+    """Accept a plain prompt or a list of chat messages; return chat messages."""
+    messages = [{"role": "user", "content": prompt}] if isinstance(prompt, str) else list(prompt)
+    if system:
+        messages = [{"role": "system", "content": system}] + messages
+    return messages
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` requests per second, with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def _iterate_in_thread(make_iterator):
+    """Drive a blocking iterator on a worker thread and yield its items asynchronously."""
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    done = object()
+
+    def pump():
+        try:
+            for item in make_iterator():
+                loop.call_soon_threadsafe(items.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(items.put_nowait, e)
+        loop.call_soon_threadsafe(items.put_nowait, done)
+
+    threading.Thread(target=pump, daemon=True).start()
+    while True:
+        item = await items.get()
+        if item is done:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+class Provider:
+    """Base class for LLM providers.
+
+    Subclasses create their client once (it is reused, so its HTTP connection
+    pool is too) and implement `_complete`, and `_stream` if the API can stream.
+    Each provider has its own concurrency limit, rate limit and timeout.
+    """
+
+    name = "base"
+
+    def __init__(self, max_concurrency=4, rate_per_second=None, timeout=30.0, retries=2, backoff=0.5):
+        self.max_concurrency = max_concurrency
+        self.limiter = RateLimiter(rate_per_second) if rate_per_second else None
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = None
+        self.requests = 0
+        self.failures = 0
+        self.retried = 0
+        self.latencies = []
+
+    async def _complete(self, messages, options):
+        raise NotImplementedError
+
+    async def _stream(self, messages, options):
+        # Providers without streaming deliver the whole answer as one chunk
+        yield await self._complete(messages, options)
+
+    def is_retryable(self, error):
+        if isinstance(error, ProviderError):
+            return error.retryable
+        return not isinstance(error, (ValueError, TypeError, NotImplementedError))
+
+    async def _slot(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        await self._semaphore.acquire()
+
+    async def _rate_limit(self):
+        if self.limiter is not None:
+            await self.limiter.acquire()
+
+    async def _wait_before_retry(self, attempt):
+        # Full jitter: a random wait up to the exponential backoff for this attempt
+        self.retried += 1
+        await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    async def complete(self, messages, **options):
+        """Return an LlmResult, retrying transient failures with jittered backoff."""
+        start = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            await self._slot()
+            try:
+                await self._rate_limit()
+                self.requests += 1
+                text = await asyncio.wait_for(self._complete(messages, options), self.timeout)
+                latency = time.perf_counter() - start
+                self.latencies.append(latency)
+                return LlmResult(text, self.name, latency, attempt + 1)
+            except Exception as e:
+                self.failures += 1
+                if attempt == self.retries or not self.is_retryable(e):
+                    raise ProviderError(f"{self.name}: {type(e).__name__}: {e}", retryable=False) from e
+            finally:
+                self._semaphore.release()
+            await self._wait_before_retry(attempt)
+
+    async def stream(self, messages, **options):
+        """Yield text chunks; retries only happen before the first chunk has been sent."""
+        for attempt in range(self.retries + 1):
+            await self._slot()
+            sent = False
+            try:
+                await self._rate_limit()
+                self.requests += 1
+                chunks = self._stream(messages, options).__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                    except StopAsyncIteration:
+                        return
+                    if chunk:
+                        sent = True
+                        yield chunk
+            except Exception as e:
+                self.failures += 1
+                if sent or attempt == self.retries or not self.is_retryable(e):
+                    raise ProviderError(f"{self.name}: {type(e).__name__}: {e}", retryable=False) from e
+            finally:
+                self._semaphore.release()
+            await self._wait_before_retry(attempt)
+
+    def stats(self):
+        latencies = np.array(self.latencies)
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retried,
+            "p50_latency": float(np.percentile(latencies, 50)) if len(latencies) else None,
+            "p99_latency": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        }
+
+
+class GeminiProvider(Provider):
+    """Google Gemini through the google-genai async client."""
+
+    name = "gemini"
+
+    def __init__(self, api_key, model="gemini-1.5-flash", **limits):
+        super().__init__(**limits)
+        from google import genai
+        self.client = genai.Client(api_key=api_key)
+        self.model = model
+
+    def _request(self, messages, options):
+        from google.genai import types
+        system = "\n".join(m["content"] for m in messages if m["role"] == "system")
+        contents = [
+            types.Content(role="model" if m["role"] == "assistant" else "user", parts=[types.Part(text=m["content"])])
+            for m in messages if m["role"] != "system"
+        ]
+        config = types.GenerateContentConfig(
+            system_instruction=system or None,
+            max_output_tokens=options.get("max_tokens"),
+            temperature=options.get("temperature"),
+        )
+        return {"model": self.model, "contents": contents, "config": config}
+
+    async def _complete(self, messages, options):
+        response = await self.client.aio.models.generate_content(**self._request(messages, options))
+        return response.text or ""
+
+    async def _stream(self, messages, options):
+        async for chunk in await self.client.aio.models.generate_content_stream(**self._request(messages, options)):
+            if chunk.text:
+                yield chunk.text
+
+
+class OpenAIProvider(Provider):
+    """OpenAI chat completions through openai.AsyncOpenAI."""
+
+    name = "openai"
+
+    def __init__(self, api_key, model="gpt-4", **limits):
+        super().__init__(**limits)
+        import openai
+        self.client = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.model = model
+
+    def _kwargs(self, messages, options):
+        kwargs = {"model": self.model, "messages": messages}
+        for key in ("max_tokens", "temperature"):
+            if options.get(key) is not None:
+                kwargs[key] = options[key]
+        return kwargs
+
+    async def _complete(self, messages, options):
+        response = await self.client.chat.completions.create(**self._kwargs(messages, options))
+        return response.choices[0].message.content or ""
+
+    async def _stream(self, messages, options):
+        async for chunk in await self.client.chat.completions.create(stream=True, **self._kwargs(messages, options)):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def _stream_line_text(line):
+    """Extract the content delta from one server-sent-events line of a streamed response."""
+    if isinstance(line, bytes):
+        line = line.decode("utf-8")
+    line = line.strip()
+    if line.startswith("data:"):
+        line = line[len("data:"):].strip()
+    if not line or line == "[DONE]":
+        return ""
+    choice = json.loads(line).get("choices", [{}])[0]
+    return choice.get("delta", {}).get("content") or choice.get("message", {}).get("content") or ""
+
+
+class LlamaProvider(Provider):
+    """Llama API. The LlamaAPI client is blocking, so calls run on worker threads."""
+
+    name = "llama"
+
+    def __init__(self, api_key, model="llama3.1-70b", **limits):
+        super().__init__(**limits)
+        from llamaapi import LlamaAPI
+        self.client = LlamaAPI(api_key)
+        self.model = model
+
+    def _request(self, messages, options, stream):
+        request = {"model": self.model, "messages": messages, "stream": stream}
+        for key in ("max_tokens", "temperature"):
+            if options.get(key) is not None:
+                request[key] = options[key]
+        return request
+
+    async def _complete(self, messages, options):
+        response = await asyncio.to_thread(self.client.run, self._request(messages, options, False))
+        if getattr(response, "status_code", 200) >= 400:
+            raise ProviderError(f"HTTP {response.status_code}", retryable=response.status_code in (429, 500, 502, 503, 504))
+        return response.json()["choices"][0]["message"]["content"] or ""
+
+    async def _stream(self, messages, options):
+        def lines():
+            response = self.client.run(self._request(messages, options, True))
+            return response.iter_lines() if hasattr(response, "iter_lines") else response
+
+        async for line in _iterate_in_thread(lines):
+            text = _stream_line_text(line)
+            if text:
+                yield text
+
+
+class StubProvider(Provider):
+    """Offline provider for tests and benchmarks: canned answers, simulated latency and failures."""
+
+    def __init__(self, name="stub", latency=0.05, jitter=0.0, failure_rate=0.0, reply=None, seed=None, **limits):
+        super().__init__(**limits)
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.reply = reply
+        self.random = random.Random(seed)
+
+    def _answer(self, messages):
+        if self.reply is not None:
+            return self.reply
+        return f"{self.name} heard: {messages[-1]['content']}"
+
+    async def _complete(self, messages, options):
+        await asyncio.sleep(self.latency + self.random.uniform(0, self.jitter))
+        if self.random.random() < self.failure_rate:
+            raise ProviderError(f"{self.name} simulated failure")
+        return self._answer(messages)
+
+    async def _stream(self, messages, options):
+        text = await self._complete(messages, options)
+        for word in text.split(" "):
+            yield word + " "
+
+
+class LlmGateway:
+    """One async front door for several LLM providers.
+
+    `complete` calls the named provider (the first one by default). With
+    `hedge_after`, a second request goes to `fallback` if the first hasn't
+    answered after that many seconds, and whichever finishes first wins. If
+    the primary fails outright, `fallback` is tried.
+
+    Blocking code can use `complete_sync` and `stream_sync`, which run on a
+    long-lived event loop thread so the providers' connection pools survive
+    between calls.
+    """
+
+    def __init__(self, providers):
+        self.providers = {provider.name: provider for provider in providers}
+        self.default = providers[0].name
+        self.hedges = 0
+        self.hedges_won = 0
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _provider(self, name):
+        try:
+            return self.providers[name or self.default]
+        except KeyError:
+            raise ValueError(f"Unknown provider: {name}")
+
+    async def complete(self, prompt, provider=None, fallback=None, hedge_after=None, system=None, **options):
+        messages = as_messages(prompt, system)
+        primary = self._provider(provider)
+        if fallback is None:
+            return await primary.complete(messages, **options)
+        secondary = self._provider(fallback)
+
+        start = time.perf_counter()
+        first = asyncio.ensure_future(primary.complete(messages, **options))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=hedge_after)
+            if first in done and first.exception() is None:
+                return first.result()
+            if first in done:
+                # Primary failed: fall back
+                result = await secondary.complete(messages, **options)
+                result.latency = time.perf_counter() - start
+                return result
+
+            # Primary is slow: hedge with the secondary and take whichever answers first
+            self.hedges += 1
+            second = asyncio.ensure_future(secondary.complete(messages, **options))
+            pending = {first, second}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        result = task.result()
+                        result.hedged = True
+                        result.latency = time.perf_counter() - start
+                        if task is second:
+                            self.hedges_won += 1
+                        for other in pending:
+                            other.cancel()
+                        return result
+                    error = task.exception()
+            raise error
+        finally:
+            if not first.done():
+                first.cancel()
+
+    async def stream(self, prompt, provider=None, system=None, **options):
+        async for chunk in self._provider(provider).stream(as_messages(prompt, system), **options):
+            yield chunk
+
+    def _ensure_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+            return self._loop
+
+    def complete_sync(self, prompt, **kwargs):
+        """Blocking version of `complete`."""
+        return asyncio.run_coroutine_threadsafe(self.complete(prompt, **kwargs), self._ensure_loop()).result()
+
+    def stream_sync(self, prompt, **kwargs):
+        """Blocking generator over the chunks of `stream`."""
+        loop = self._ensure_loop()
+        chunks = self.stream(prompt, **kwargs).__aiter__()
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(chunks.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Release the provider's slot if the caller stops reading early
+            asyncio.run_coroutine_threadsafe(chunks.aclose(), loop).result()
+
+    def stats(self):
+        stats = {name: provider.stats() for name, provider in self.providers.items()}
+        stats["hedging"] = {"hedged": self.hedges, "won_by_fallback": self.hedges_won}
+        return stats
+
+
+async def _load_test(gateway, count, **kwargs):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(gateway.complete(f"question {i}", **kwargs) for i in range(count)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    errors = [r for r in results if isinstance(r, Exception)]
+    latencies = np.array([r.latency for r in results if not isinstance(r, Exception)])
+    print(f"  {count} requests in {elapsed:.2f}s, {len(errors)} failed, "
+          f"p50 {np.percentile(latencies, 50) * 1000:.0f} ms, p99 {np.percentile(latencies, 99) * 1000:.0f} ms")
+
+
+def demo(count=200):
+    """Exercise retries, concurrency limits and hedging against offline stub providers."""
+    def providers():
+        return [
+            StubProvider("slow", latency=0.05, jitter=1.0, failure_rate=0.1, seed=1, max_concurrency=20, retries=2, backoff=0.05),
+            StubProvider("fast", latency=0.1, jitter=0.05, seed=2, max_concurrency=20, rate_per_second=500),
+        ]
+
+    print("Without hedging:")
+    gateway = LlmGateway(providers())
+    asyncio.run(_load_test(gateway, count))
+    print(f"  {gateway.stats()['slow']}")
+
+    print("Hedging to 'fast' after 300 ms:")
+    gateway = LlmGateway(providers())
+    asyncio.run(_load_test(gateway, count, fallback="fast", hedge_after=0.3))
+    print(f"  {gateway.stats()['hedging']}")
+
+
+if __name__ == "__main__":
+    # Usage: python llm_gateway.py [requests]
+    demo(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
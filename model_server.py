@@ -0,0 +1,366 @@
+import os
+import gc
+import sys
+import json
+import time
+import base64
+import threading
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import speech_recognition as sr
+from audio_buffer import PcmBuffer
+
+# Where the server listens and clients connect (host:port)
+DEFAULT_ADDRESS = os.environ.get("MODEL_SERVER", "127.0.0.1:8765")
+
+
+def rss_bytes():
+    """Resident memory of this process, or None if it can't be read."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _load_whisper(size="base"):
+    from asr_backends import WhisperRecognizer
+    return WhisperRecognizer(size)
+
+
+def _load_zero_shot(model="default"):
+    # The classifier lives with the Milestone 2 scripts that use it
+    milestone_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Milestone 2")
+    if milestone_dir not in sys.path:
+        sys.path.append(milestone_dir)
+    from intent_classifier import ZeroShotIntentClassifier
+    return ZeroShotIntentClassifier(model)
+
+
+def _load_gpt2(name="gpt2"):
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    tokenizer.pad_token = tokenizer.eos_token
+    model = AutoModelForCausalLM.from_pretrained(name).to(device).eval()
+    model.config.pad_token_id = tokenizer.pad_token_id
+    return {"tokenizer": tokenizer, "model": model, "device": device}
+
+
+# Model name -> (kind, loader). Nothing is loaded until first use or warm-up.
+LOADERS = {
+    "whisper": ("asr", lambda: _load_whisper("base")),
+    "zero-shot": ("intent", lambda: _load_zero_shot(os.environ.get("INTENT_MODEL", "default"))),
+    "zero-shot-small": ("intent", lambda: _load_zero_shot("small")),
+    "gpt2": ("llm", lambda: _load_gpt2("gpt2")),
+    "gpt2-medium": ("llm", lambda: _load_gpt2("gpt2-medium")),
+}
+
+
+class ModelEntry:
+    def __init__(self, name, kind, model, load_seconds, rss_delta):
+        self.name = name
+        self.kind = kind
+        self.model = model
+        self.load_seconds = load_seconds
+        self.rss_delta = rss_delta
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+        self.requests = 0
+        self.busy_seconds = 0.0
+        self.active = 0
+        # One request at a time per model, so CPU threads aren't oversubscribed
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Loads models on first use and evicts the least recently used ones.
+
+    At most `max_models` stay resident; a model idle for longer than
+    `idle_timeout` seconds is unloaded by a background sweep. Models that are
+    serving a request are never evicted.
+    """
+
+    def __init__(self, loaders=None, max_models=3, idle_timeout=600.0):
+        self.loaders = loaders or LOADERS
+        self.max_models = max_models
+        self.idle_timeout = idle_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self.evictions = 0
+        self.started = time.time()
+        self._stop = threading.Event()
+        threading.Thread(target=self._sweep, daemon=True).start()
+
+    def get(self, name):
+        """Return the loaded entry for `name`, loading it if needed."""
+        if name not in self.loaders:
+            raise KeyError(f"Unknown model: {name}")
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                self._entries.move_to_end(name)
+                return entry
+            # Concurrent requests for the same model wait on a single load
+            load_lock = self._loading.setdefault(name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                if name in self._entries:
+                    return self._entries[name]
+            kind, loader = self.loaders[name]
+            print(f"Loading {name}...")
+            before = rss_bytes()
+            start = time.perf_counter()
+            model = loader()
+            load_seconds = time.perf_counter() - start
+            after = rss_bytes()
+            rss_delta = after - before if before is not None and after is not None else None
+            entry = ModelEntry(name, kind, model, load_seconds, rss_delta)
+            print(f"Loaded {name} in {load_seconds:.1f}s")
+            with self._lock:
+                self._entries[name] = entry
+                self._evict_over_limit()
+            return entry
+
+    def run(self, name, func):
+        """Call `func(model)` on the named model and record its usage."""
+        while True:
+            entry = self.get(name)
+            with self._lock:
+                # Mark it busy only if it wasn't evicted in the meantime
+                if self._entries.get(name) is entry:
+                    entry.active += 1
+                    break
+        try:
+            with entry.lock:
+                start = time.perf_counter()
+                result = func(entry.model)
+                entry.busy_seconds += time.perf_counter() - start
+                entry.requests += 1
+            return result
+        finally:
+            with self._lock:
+                entry.active -= 1
+                entry.last_used = time.monotonic()
+
+    def warm_up(self, names):
+        """Load every model in `names` now; returns {name: load_seconds}."""
+        return {name: self.get(name).load_seconds for name in names}
+
+    def unload(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry.active:
+                return False
+            del self._entries[name]
+            self.evictions += 1
+        print(f"Unloaded {name}")
+        gc.collect()
+        return True
+
+    def _evict_over_limit(self):
+        # Called with self._lock held; oldest idle models go first
+        for name in list(self._entries):
+            if len(self._entries) <= self.max_models:
+                break
+            if self._entries[name].active == 0 and name != next(reversed(self._entries)):
+                del self._entries[name]
+                self.evictions += 1
+                print(f"Evicted {name}")
+        gc.collect()
+
+    def _sweep(self):
+        while not self._stop.wait(min(60.0, self.idle_timeout)):
+            now = time.monotonic()
+            with self._lock:
+                idle = [name for name, entry in self._entries.items()
+                        if entry.active == 0 and now - entry.last_used > self.idle_timeout]
+            for name in idle:
+                self.unload(name)
+
+    def metrics(self):
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                name: {
+                    "kind": entry.kind,
+                    "load_seconds": round(entry.load_seconds, 3),
+                    "rss_mb": round(entry.rss_delta / 2 ** 20, 1) if entry.rss_delta is not None else None,
+                    "requests": entry.requests,
+                    "mean_latency_ms": round(1000 * entry.busy_seconds / entry.requests, 1) if entry.requests else None,
+                    "idle_seconds": round(now - entry.last_used, 1),
+                }
+                for name, entry in self._entries.items()
+            }
+        process_rss = rss_bytes()
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "process_rss_mb": round(process_rss / 2 ** 20, 1) if process_rss is not None else None,
+            "max_models": self.max_models,
+            "evictions": self.evictions,
+            "available": sorted(self.loaders),
+            "loaded": models,
+        }
+
+
+def transcribe(registry, request):
+    buffer = PcmBuffer(base64.b64decode(request["audio"]), request["sample_rate"], 2, request.get("channels", 1))
+    return {"text": registry.run(request.get("model", "whisper"), lambda recognizer: recognizer.transcribe(buffer))}
+
+
+def classify(registry, request):
+    results = registry.run(request.get("model", "zero-shot"), lambda classifier: classifier.classify_batch(request["texts"]))
+    return {"results": [[intent, score] for intent, score in results]}
+
+
+def generate(registry, request):
+    from gpt2_engine import DecodingConfig, generate_text
+    config = DecodingConfig(**request.get("decoding", {}))
+
+    def run(llm):
+        return generate_text(llm["model"], llm["tokenizer"], request["prompt"], config, llm["device"])
+
+    return registry.run(request.get("model", "gpt2"), run)
+
+
+class ModelRequestHandler(BaseHTTPRequestHandler):
+    registry = None
+    routes = {
+        "/transcribe": transcribe,
+        "/classify": classify,
+        "/generate": generate,
+    }
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, {"status": "ok"})
+        elif self.path == "/metrics":
+            self._reply(200, self.registry.metrics())
+        else:
+            self._reply(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/warmup":
+                self._reply(200, {"loaded": self.registry.warm_up(request.get("models", []))})
+            elif self.path == "/unload":
+                self._reply(200, {"unloaded": self.registry.unload(request["model"])})
+            elif self.path in self.routes:
+                self._reply(200, self.routes[self.path](self.registry, request))
+            else:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+        except sr.UnknownValueError:
+            self._reply(422, {"error": "unknown_value"})
+        except (KeyError, ValueError) as e:
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(address=DEFAULT_ADDRESS, warm=(), max_models=3, idle_timeout=600.0):
+    """Run the model server until interrupted."""
+    host, port = address.rsplit(":", 1)
+    ModelRequestHandler.registry = ModelRegistry(max_models=max_models, idle_timeout=idle_timeout)
+    if warm:
+        ModelRequestHandler.registry.warm_up(warm)
+    server = ThreadingHTTPServer((host, int(port)), ModelRequestHandler)
+    print(f"Model server listening on http://{address} (models: {', '.join(sorted(LOADERS))})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class ModelClient:
+    """Talks to a running model server over local HTTP."""
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=120.0):
+        self.url = f"http://{address}"
+        self.timeout = timeout
+
+    def _call(self, path, payload=None, timeout=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            error = json.loads(e.read() or b"{}").get("error", str(e))
+            if e.code == 422:
+                raise sr.UnknownValueError()
+            raise RuntimeError(f"Model server error: {error}")
+
+    def available(self):
+        try:
+            return self._call("/health", timeout=0.5).get("status") == "ok"
+        except (OSError, ValueError):
+            return False
+
+    def transcribe(self, audio, model="whisper"):
+        """Transcribe a PcmBuffer or AudioData on the server."""
+        if not isinstance(audio, PcmBuffer):
+            audio = PcmBuffer.from_audio_data(audio)
+        audio = audio.mono()
+        return self._call("/transcribe", {
+            "model": model,
+            "audio": base64.b64encode(bytes(audio.data)).decode("ascii"),
+            "sample_rate": audio.sample_rate,
+        })["text"]
+
+    def classify(self, texts, model="zero-shot"):
+        """Return [(intent, score), ...] for `texts`."""
+        return [tuple(result) for result in self._call("/classify", {"model": model, "texts": list(texts)})["results"]]
+
+    def generate(self, prompt, model="gpt2", decoding=None):
+        """Complete `prompt` with a DecodingConfig; returns the new text only (see gpt2_engine.generate_text)."""
+        decoding = decoding.as_dict() if decoding is not None else {}
+        return self._call("/generate", {"model": model, "prompt": prompt, "decoding": decoding})
+
+    def warm_up(self, *models):
+        return self._call("/warmup", {"models": list(models)})["loaded"]
+
+    def metrics(self):
+        return self._call("/metrics")
+
+
+def connect_model_server(address=None):
+    """Return a ModelClient if a server is running at `address`, else None."""
+    client = ModelClient(address or DEFAULT_ADDRESS)
+    return client if client.available() else None
+
+
+if __name__ == "__main__":
+    # Usage: python model_server.py [host:port] [model_to_warm ...]
+    # e.g.   python model_server.py 127.0.0.1:8765 whisper zero-shot gpt2
+    serve(
+        sys.argv[1] if len(sys.argv) > 1 else DEFAULT_ADDRESS,
+        sys.argv[2:],
+        max_models=int(os.environ.get("MODEL_SERVER_MAX_MODELS", 3)),
+        idle_timeout=float(os.environ.get("MODEL_SERVER_IDLE_TIMEOUT", 600)),
+    )
@@ -0,0 +1,581 @@
+import os
+import sys
+import json
+import time
+import base64
+import random
+import threading
+import contextlib
+from queue import Queue, Empty
+from collections import deque
+from urllib.parse import urlencode
+import numpy as np
+
+# AssemblyAI realtime endpoint (override with ASSEMBLYAI_REALTIME_URL, e.g. to use the mock server)
+REALTIME_URL = os.environ.get("ASSEMBLYAI_REALTIME_URL", "wss://api.assemblyai.com/v2/realtime/ws")
+
+# Close codes the server uses for errors a reconnect can't fix (bad request, auth, billing, expiry)
+FATAL_CLOSE_CODES = {4000, 4001, 4002, 4003, 4008, 4100, 4101}
+
+_CLOSED = object()
+
+
+class RealtimeError(Exception):
+    """The realtime session failed and could not be re-established."""
+
+
+class RealtimeServerError(RealtimeError):
+    """The server rejected the session (e.g. insufficient funds); retrying won't help."""
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else None
+
+
+class Turn:
+    """One user turn and when each of its stages happened (perf_counter seconds).
+
+    `speech_start` and `speech_end` come from the audio offsets the server
+    reports, mapped onto the local clock; the rest are arrival times. Callers
+    add their own stages (LLM reply, TTS, playback) with `mark(name)`.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.speech_start = None
+        self.speech_end = None
+        self.first_partial = None
+        self.final = None
+        self.endpoint = None
+        self.connect_seconds = 0.0
+        self.reconnects = 0
+        self.marks = {}
+
+    def mark(self, name):
+        self.marks[name] = time.perf_counter()
+
+    def report(self):
+        """Return the turn's latencies in seconds (None if not reached)."""
+        def between(start, end):
+            return None if start is None or end is None else max(0.0, end - start)
+        report = {
+            "connect": self.connect_seconds,
+            "first_partial": between(self.speech_start, self.first_partial),
+            "final": between(self.speech_end, self.final),
+            "endpoint": between(self.speech_end, self.endpoint),
+        }
+        # Caller stages are measured from the end of the user's speech
+        for name, t in self.marks.items():
+            report[name] = between(self.speech_end, t)
+        return report
+
+    def summary(self):
+        parts = []
+        for name, value in self.report().items():
+            parts.append(f"{name}={value:.2f}s" if value is not None else f"{name}=n/a")
+        return ", ".join(parts)
+
+
+class RealtimeSession:
+    """One streaming transcription session kept open for a whole conversation.
+
+    Audio chunks (16-bit mono PCM bytes) are read from `audio_source` on a
+    background thread and streamed to the AssemblyAI realtime API over a
+    single websocket. The server finalises an utterance after
+    `end_utterance_silence` ms of silence; a turn ends once a final transcript
+    has been followed by `turn_silence` seconds without new speech, so
+    several utterances separated by short pauses become one turn.
+    `next_turn()` returns completed turns in order.
+
+    If the connection drops or can't be made, the session reconnects with
+    jittered backoff, giving up after `max_retries` consecutive failures; a
+    connection counts as healthy again once it stayed up `stable_seconds`.
+    Errors reported by the server itself end the session at once. After a
+    reconnect, the audio sent since the last final transcript plus the audio
+    captured meanwhile (up to `buffer_seconds` of it) is replayed, so no
+    words are lost. While `muted()` (e.g. during playback of the reply)
+    silence is sent instead of the microphone, so the assistant doesn't
+    transcribe itself and the connection stays warm.
+
+    `on_partial(text)` and `on_final(text)` are called from the receiver
+    thread as transcripts arrive.
+    """
+
+    def __init__(self, api_key, audio_source, sample_rate=16000, url=None,
+                 end_utterance_silence=500, turn_silence=0.3, max_retries=5,
+                 backoff=0.5, max_backoff=8.0, stable_seconds=2.0, buffer_seconds=10.0,
+                 on_partial=None, on_final=None):
+        self.api_key = api_key
+        self.audio_source = audio_source
+        self.sample_rate = sample_rate
+        self.url = url or REALTIME_URL
+        self.end_utterance_silence = end_utterance_silence
+        self.turn_silence = turn_silence
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable_seconds = stable_seconds
+        self.on_partial = on_partial
+        self.on_final = on_final
+        self.connects = 0
+        self.reconnects = 0
+        self.dropped_bytes = 0
+        self.turn_reports = []
+        self.error = None
+
+        # Audio captured while disconnected, and audio sent but not yet covered by a final transcript
+        self._buffer = deque()
+        self._buffer_bytes = 0
+        self._unconfirmed = deque()
+        self._unconfirmed_bytes = 0
+        self._max_buffer_bytes = int(buffer_seconds * sample_rate * 2)
+        self._send_lock = threading.Lock()
+        self._ws = None
+        self._epoch = None
+        self._muted = 0
+        self._turns = Queue()
+        self._turn = None
+        self._pending_partial = False
+        self._last_activity = None
+        self._connect_seconds = 0.0
+        self._ready = threading.Event()
+        self._closing = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Connect, then start streaming; raises RealtimeError if no connection can be made."""
+        for target, name in [(self._run, "realtime-receive"), (self._pump, "realtime-audio")]:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Terminate the session and stop the background threads."""
+        if self._closing.is_set():
+            return
+        self._closing.set()
+        with self._send_lock:
+            ws, self._ws = self._ws, None
+        if ws is not None:
+            with contextlib.suppress(Exception):
+                ws.send(json.dumps({"terminate_session": True}))
+            with contextlib.suppress(Exception):
+                ws.close()
+        self._turns.put(_CLOSED)
+
+    # Connection management
+
+    def _run(self):
+        """Keep a connection open until closed, reconnecting whenever it drops."""
+        from websockets.sync.client import connect
+
+        query = urlencode({"sample_rate": self.sample_rate, "encoding": "pcm_s16le"})
+        failures = 0
+        delay = self.backoff
+        while not self._closing.is_set():
+            started = time.perf_counter()
+            began = None
+            try:
+                with connect(f"{self.url}?{query}", additional_headers={"Authorization": self.api_key},
+                             open_timeout=10) as ws:
+                    self._begin(ws, started)
+                    began = time.perf_counter()
+                    self._receive(ws)
+            except Exception as e:
+                if self._closing.is_set():
+                    break
+                with self._send_lock:
+                    self._ws = None
+                close_code = getattr(getattr(e, "rcvd", None), "code", None)
+                if isinstance(e, RealtimeServerError) or close_code in FATAL_CLOSE_CODES:
+                    print(f"Realtime session rejected by the server: {e}")
+                    self.error = e if isinstance(e, RealtimeServerError) else RealtimeServerError(str(e))
+                    self._turns.put(self.error)
+                    break
+                if began is not None and time.perf_counter() - began >= self.stable_seconds:
+                    # The connection had been healthy, so this is a fresh failure
+                    failures = 0
+                    delay = self.backoff
+                failures += 1
+                print(f"Realtime connection {'lost' if began is not None else 'failed'} (attempt {failures}): {e}")
+                if failures > self.max_retries:
+                    self.error = RealtimeError(f"Realtime connection to {self.url} failed {failures} times in a row")
+                    self._turns.put(self.error)
+                    break
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay = min(delay * 2, self.max_backoff)
+        self._ready.set()
+
+    def _begin(self, ws, started):
+        """Wait for SessionBegins, configure endpointing and flush audio buffered meanwhile."""
+        begins = json.loads(ws.recv(timeout=10))
+        if "error" in begins:
+            raise RealtimeServerError(begins["error"])
+        if begins.get("message_type") != "SessionBegins":
+            raise RealtimeError(f"Unexpected first message: {begins}")
+        ws.send(json.dumps({"end_utterance_silence_threshold": self.end_utterance_silence}))
+        with self._send_lock:
+            self._connect_seconds += time.perf_counter() - started
+            if self.connects:
+                self.reconnects += 1
+                if self._turn is not None:
+                    self._turn.reconnects += 1
+            self.connects += 1
+            replay = list(self._unconfirmed) + list(self._buffer)
+            self._unconfirmed.clear()
+            self._unconfirmed_bytes = 0
+            self._buffer.clear()
+            self._buffer_bytes = 0
+            # Server audio offsets restart at zero on every connection
+            self._epoch = time.perf_counter() - sum(len(chunk) for chunk in replay) / (2 * self.sample_rate)
+            for chunk in replay:
+                ws.send(chunk)
+                self._remember(chunk)
+            self._ws = ws
+        self._ready.set()
+
+    # Audio
+
+    @contextlib.contextmanager
+    def muted(self):
+        """Send silence instead of microphone audio for the duration of the block."""
+        with self._send_lock:
+            self._muted += 1
+        try:
+            yield
+        finally:
+            with self._send_lock:
+                self._muted -= 1
+
+    def _pump(self):
+        for chunk in self.audio_source:
+            if self._closing.is_set():
+                return
+            with self._send_lock:
+                if self._muted:
+                    chunk = bytes(len(chunk))
+                if self._ws is not None:
+                    try:
+                        self._ws.send(chunk)
+                        self._remember(chunk)
+                        continue
+                    except Exception:
+                        # The receiver notices the closed socket and reconnects
+                        self._ws = None
+                self._buffer.append(chunk)
+                self._buffer_bytes += len(chunk)
+                while self._buffer_bytes > self._max_buffer_bytes:
+                    dropped = self._buffer.popleft()
+                    self._buffer_bytes -= len(dropped)
+                    self.dropped_bytes += len(dropped)
+
+    def _remember(self, chunk):
+        # Called with _send_lock held
+        self._unconfirmed.append(chunk)
+        self._unconfirmed_bytes += len(chunk)
+        while self._unconfirmed_bytes > self._max_buffer_bytes:
+            self._unconfirmed_bytes -= len(self._unconfirmed.popleft())
+
+    # Transcripts and endpointing
+
+    def _receive(self, ws):
+        """Handle server messages until the connection closes or reports an error."""
+        while not self._closing.is_set():
+            try:
+                message = json.loads(ws.recv(timeout=0.05))
+            except TimeoutError:
+                self._check_endpoint()
+                continue
+            if "error" in message:
+                raise RealtimeServerError(message["error"])
+            self._handle(message)
+            self._check_endpoint()
+
+    def _audio_time(self, ms):
+        return None if ms is None or self._epoch is None else self._epoch + ms / 1000
+
+    def _handle(self, message):
+        kind = message.get("message_type")
+        if kind not in ("PartialTranscript", "FinalTranscript") or not message.get("text"):
+            return
+        now = time.perf_counter()
+        turn = self._turn
+        if turn is None:
+            turn = self._turn = Turn()
+            turn.connect_seconds, self._connect_seconds = self._connect_seconds, 0.0
+        if turn.speech_start is None:
+            turn.speech_start = min(now, self._audio_time(message.get("audio_start")) or now)
+        if turn.first_partial is None:
+            turn.first_partial = now
+        self._last_activity = now
+        if kind == "PartialTranscript":
+            self._pending_partial = True
+            if self.on_partial is not None:
+                self.on_partial((turn.text + " " + message["text"]).strip())
+        else:
+            self._pending_partial = False
+            with self._send_lock:
+                self._unconfirmed.clear()
+                self._unconfirmed_bytes = 0
+            turn.text = (turn.text + " " + message["text"]).strip()
+            turn.final = now
+            turn.speech_end = min(now, self._audio_time(message.get("audio_end")) or now)
+            if self.on_final is not None:
+                self.on_final(message["text"])
+
+    def _check_endpoint(self):
+        turn = self._turn
+        if turn is None or not turn.text or self._pending_partial:
+            return
+        now = time.perf_counter()
+        if now - self._last_activity >= self.turn_silence:
+            turn.endpoint = now
+            self._turn = None
+            self._turns.put(turn)
+
+    def next_turn(self, timeout=None):
+        """Block until the user finishes a turn and return it (None on timeout).
+
+        Raises RealtimeError if the session is closed or could not reconnect.
+        """
+        try:
+            turn = self._turns.get(timeout=timeout)
+        except Empty:
+            return None
+        if turn is _CLOSED or isinstance(turn, Exception):
+            self._turns.put(turn)
+            raise turn if isinstance(turn, Exception) else RealtimeError("Realtime session is closed")
+        return turn
+
+    def finish_turn(self, turn):
+        """Record a handled turn's latencies (call after adding the caller's marks)."""
+        self.turn_reports.append(turn.report())
+
+    def stats(self):
+        """Median and p95 of every recorded latency across finished turns."""
+        stats = {"turns": len(self.turn_reports), "connects": self.connects,
+                 "reconnects": self.reconnects, "dropped_seconds": self.dropped_bytes / (2 * self.sample_rate)}
+        names = []
+        for report in self.turn_reports:
+            names.extend(name for name in report if name not in names)
+        for name in names:
+            values = [report[name] for report in self.turn_reports if report.get(name) is not None]
+            stats[f"{name}_p50"] = _percentile(values, 0.5)
+            stats[f"{name}_p95"] = _percentile(values, 0.95)
+        return stats
+
+
+class ScriptedCaller:
+    """Microphone stand-in: yields real-time PCM chunks of silence, and of a
+    voiced-sounding tone for `speech_seconds` whenever `speak_next()` asks it
+    to answer (after `lead` seconds, like a caller who waits for the prompt).
+    """
+
+    def __init__(self, speech_seconds=1.5, lead=0.2, sample_rate=16000, chunk_ms=50):
+        self.speech_seconds = speech_seconds
+        self.lead = lead
+        self.chunk_ms = chunk_ms
+        samples = sample_rate * chunk_ms // 1000
+        t = np.arange(samples) / sample_rate
+        self._voiced = (3000 * np.sin(2 * np.pi * 180 * t) + 1500 * np.sin(2 * np.pi * 360 * t)).astype(np.int16).tobytes()
+        self._silent = bytes(samples * 2)
+        self._speak_from = None
+        self._lock = threading.Lock()
+
+    def speak_next(self):
+        with self._lock:
+            self._speak_from = time.perf_counter() + self.lead
+
+    def __iter__(self):
+        next_time = time.perf_counter()
+        while True:
+            next_time += self.chunk_ms / 1000
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+            with self._lock:
+                speaking = self._speak_from is not None and 0 <= next_time - self._speak_from < self.speech_seconds
+            yield self._voiced if speaking else self._silent
+
+
+class MockRealtimeServer:
+    """Local stand-in for the AssemblyAI realtime websocket API.
+
+    Speaks the same message protocol. Voiced audio (by RMS energy) is
+    "transcribed" as the next scripted utterance: partials reveal it word by
+    word, and a final arrives once `end_utterance_silence_threshold` ms of
+    silence follow it. `connect_delay` simulates the handshake and
+    `warmup_delay` a new session's first-partial delay. With `drop_after`
+    set, each connection is cut after that many seconds to test reconnects.
+    """
+
+    def __init__(self, utterances, host="127.0.0.1", port=0, connect_delay=0.0,
+                 warmup_delay=0.0, partial_interval=0.2, drop_after=None, energy_threshold=500):
+        self.utterances = list(utterances)
+        self.connect_delay = connect_delay
+        self.warmup_delay = warmup_delay
+        self.partial_interval = partial_interval
+        self.drop_after = drop_after
+        self.energy_threshold = energy_threshold
+        self.connections = 0
+        self._next_utterance = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self.host = host
+        self.port = port
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/v2/realtime/ws"
+
+    def start(self):
+        from websockets.sync.server import serve
+        self._server = serve(self._session, self.host, self.port)
+        self.port = self._server.socket.getsockname()[1]
+        threading.Thread(target=self._server.serve_forever, name="mock-realtime", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _utterance(self):
+        # The script only advances once an utterance was finalised, so audio
+        # replayed after a dropped connection is transcribed the same way again
+        with self._lock:
+            return self.utterances[self._next_utterance % len(self.utterances)].split()
+
+    def _finalised(self):
+        with self._lock:
+            self._next_utterance += 1
+
+    def _session(self, ws):
+        from websockets.exceptions import ConnectionClosed
+        with contextlib.suppress(ConnectionClosed):
+            self._transcribe(ws)
+
+    def _transcribe(self, ws):
+        from urllib.parse import urlparse, parse_qs
+        sample_rate = int(parse_qs(urlparse(ws.request.path).query).get("sample_rate", ["16000"])[0])
+        with self._lock:
+            self.connections += 1
+        time.sleep(self.connect_delay)
+        ws.send(json.dumps({"message_type": "SessionBegins", "session_id": f"mock-{self.connections}",
+                            "expires_at": "2099-01-01T00:00:00"}))
+        opened = time.perf_counter()
+        silence_ms = 700
+        audio_ms = 0.0
+        speech_start = None
+        speech_end = None
+        words = None
+        last_partial = None
+        ready_at = time.perf_counter() + self.warmup_delay
+        for data in ws:
+            if self.drop_after is not None and time.perf_counter() - opened > self.drop_after:
+                # Close with an internal-error code, like a server-side failure
+                ws.close(1011, "mock connection drop")
+                return
+            if isinstance(data, str):
+                message = json.loads(data)
+                if message.get("terminate_session"):
+                    ws.send(json.dumps({"message_type": "SessionTerminated"}))
+                    return
+                if "end_utterance_silence_threshold" in message:
+                    silence_ms = message["end_utterance_silence_threshold"]
+                if "audio_data" not in message:
+                    continue
+                data = base64.b64decode(message["audio_data"])
+            samples = np.frombuffer(data, dtype=np.int16)
+            chunk_ms = len(samples) * 1000 / sample_rate
+            rms = float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) if len(samples) else 0.0
+            if rms >= self.energy_threshold:
+                if speech_start is None:
+                    speech_start = audio_ms
+                    words = self._utterance()
+                speech_end = audio_ms + chunk_ms
+            audio_ms += chunk_ms
+            if speech_start is None or time.perf_counter() < ready_at:
+                continue
+            now = time.perf_counter()
+            if audio_ms - speech_end >= silence_ms:
+                ws.send(json.dumps({"message_type": "FinalTranscript", "text": " ".join(words),
+                                    "audio_start": int(speech_start), "audio_end": int(speech_end)}))
+                self._finalised()
+                speech_start = speech_end = words = last_partial = None
+            elif last_partial is None or now - last_partial >= self.partial_interval:
+                revealed = max(1, int(len(words) * min(1.0, (speech_end - speech_start) / 2000)))
+                ws.send(json.dumps({"message_type": "PartialTranscript", "text": " ".join(words[:revealed]),
+                                    "audio_start": int(speech_start), "audio_end": int(speech_end)}))
+                last_partial = now
+
+
+def benchmark(turns=5, connect_delay=0.4, warmup_delay=0.3, reply_seconds=2.0, sample_rate=16000):
+    """Replay a scripted conversation against the mock server three ways and compare them.
+
+    "per-turn session" is the old loop: a new connection and microphone
+    stream for every turn. The persistent session keeps one connection, and
+    is run once more with the server dropping the connection every 3 seconds.
+    Each turn the caller speaks for 1.5s, then the reply takes `reply_seconds`.
+    """
+    utterances = [f"this is scripted answer number {i} about my order" for i in range(turns)]
+
+    def take_turn(session, caller, i, reports):
+        caller.speak_next()
+        turn = session.next_turn(timeout=30)
+        if turn is None:
+            raise RealtimeError("No turn received")
+        with session.muted():
+            time.sleep(reply_seconds)  # Stand-in for the LLM reply and its playback
+        turn.mark("replied")
+        session.finish_turn(turn)
+        reports.append(turn.report())
+        print(f"  turn {i + 1}: {turn.text!r} ({turn.summary()})")
+
+    for mode in ["per-turn session", "persistent session", "persistent, dropped every 3s"]:
+        drop_after = 3.0 if "dropped" in mode else None
+        with MockRealtimeServer(utterances, connect_delay=connect_delay, warmup_delay=warmup_delay,
+                                drop_after=drop_after) as server:
+            print(f"{mode}:")
+            reports = []
+            start = time.perf_counter()
+            if mode == "per-turn session":
+                for i in range(turns):
+                    caller = ScriptedCaller(sample_rate=sample_rate)
+                    with RealtimeSession("mock-key", caller, sample_rate, url=server.url) as session:
+                        take_turn(session, caller, i, reports)
+            else:
+                caller = ScriptedCaller(sample_rate=sample_rate)
+                with RealtimeSession("mock-key", caller, sample_rate, url=server.url) as session:
+                    for i in range(turns):
+                        take_turn(session, caller, i, reports)
+            elapsed = time.perf_counter() - start
+
+            def p50(name):
+                return _percentile([r[name] for r in reports if r[name] is not None], 0.5)
+            print(f"  {len(reports)} turns in {elapsed:.1f}s ({elapsed / turns:.2f}s/turn) over "
+                  f"{server.connections} connection(s); median connect {p50('connect'):.2f}s, "
+                  f"first partial {p50('first_partial'):.2f}s, endpoint {p50('endpoint'):.2f}s")
+
+
+if __name__ == "__main__":
+    # Usage: python realtime_transcriber.py [turns] [connect_delay] [warmup_delay]
+    benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.4,
+        float(sys.argv[3]) if len(sys.argv) > 3 else 0.3,
+    )
@@ -0,0 +1,364 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Default location of the persistent cache (override with RESPONSE_CACHE)
+DEFAULT_PATH = os.environ.get("RESPONSE_CACHE", "response_cache.db")
+
+
+def normalize_text(text):
+    """Lowercase, drop punctuation and collapse whitespace, so trivial variations share a key."""
+    text = re.sub(r"[^\w\s']", " ", text.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+
+# Words that flip a complaint's meaning; a similar hit must have the same ones
+NEGATIONS = {"no", "not", "never", "none", "nothing", "nobody", "neither", "nor", "cannot", "without"}
+
+
+def negations(text):
+    """Return the negation words in normalized `text` (including "n't" contractions)."""
+    return sorted(word for word in text.split() if word in NEGATIONS or word.endswith("n't"))
+
+
+def _digest(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class HashingEmbedder:
+    """Dependency-free embedding: hashed word and word-bigram counts, L2-normalised.
+
+    Only catches near-verbatim repeats (reordered or slightly reworded
+    complaints); use SentenceTransformerEmbedder for real paraphrases. A
+    one-word change barely moves the vector, so its default threshold only
+    accepts near-exact matches.
+    """
+
+    name = "hashing"
+    similarity_threshold = 0.95
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    def embed(self, text):
+        words = normalize_text(text).split()
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            index = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "little")
+            vector[index % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model (`pip install sentence-transformers`)."""
+
+    name = "minilm"
+    similarity_threshold = 0.9
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, text):
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "minilm": SentenceTransformerEmbedder,
+}
+
+
+class _VectorIndex:
+    """Brute-force cosine index over normalised vectors, one per cached entry of a namespace."""
+
+    def __init__(self):
+        self.keys = []
+        self.vectors = []
+        self._matrix = None
+
+    def add(self, key, vector):
+        self.keys.append(key)
+        self.vectors.append(vector)
+        self._matrix = None
+
+    def remove(self, key):
+        if key in self.keys:
+            index = self.keys.index(key)
+            del self.keys[index]
+            del self.vectors[index]
+            self._matrix = None
+
+    def nearest(self, vector):
+        if not self.keys:
+            return None, 0.0
+        if self._matrix is None:
+            self._matrix = np.vstack(self.vectors)
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self.keys[best], float(scores[best])
+
+
+class ResponseCache:
+    """Two-tier cache for LLM responses, persisted in SQLite.
+
+    The exact tier is keyed on the normalized input text plus the prompt and
+    config that produced the response. With an `embedder`, a miss falls back
+    to the most similar cached input under the same prompt and config, if its
+    cosine similarity is at least `similarity_threshold` (by default the
+    embedder's own) and both contain the same negations. Entries expire after
+    `ttl` seconds and the least recently used go once there are more than
+    `max_entries`. Values must be JSON-serializable.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_entries=5000, ttl=7 * 24 * 3600,
+                 embedder=None, similarity_threshold=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embedder = EMBEDDERS[embedder]() if isinstance(embedder, str) else embedder
+        if similarity_threshold is None:
+            similarity_threshold = getattr(self.embedder, "similarity_threshold", 0.9)
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._indexes = {}
+        self._lock = threading.RLock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, namespace TEXT, text TEXT, "
+                "value TEXT, created REAL, seconds REAL, embedder TEXT, embedding BLOB)"
+            )
+            self._load()
+
+    def _load(self):
+        now = time.time()
+        self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+        rows = self._db.execute(
+            "SELECT key, namespace, text, value, created, seconds, embedder, embedding FROM responses ORDER BY created"
+        )
+        for key, namespace, text, value, created, seconds, embedder, embedding in rows:
+            entry = {"namespace": namespace, "text": text, "value": json.loads(value),
+                     "created": created, "seconds": seconds}
+            self._entries[key] = entry
+            if self.embedder is not None:
+                # Reuse stored vectors from the same embedder; re-embed otherwise
+                vector = (np.frombuffer(embedding, dtype=np.float32) if embedding and embedder == self.embedder.name
+                          else self.embedder.embed(text))
+                self._indexes.setdefault(namespace, _VectorIndex()).add(key, vector)
+        self._evict()
+
+    def lookup(self, text, prompt="", config=None):
+        """Return (value, tier) for a cached response, or (None, None) on a miss."""
+        namespace = _digest(prompt, config)
+        normalized = normalize_text(text)
+        key = _digest(namespace, normalized)
+        vector = None
+        with self._lock:
+            entry = self._fresh(key)
+            tier = "exact"
+            if entry is None and self.embedder is not None and namespace in self._indexes:
+                vector = self.embedder.embed(normalized)
+                nearest, score = self._indexes[namespace].nearest(vector)
+                if nearest is not None and score >= self.similarity_threshold:
+                    entry = self._fresh(nearest)
+                    key = nearest
+                    tier = "semantic"
+                    # "late" and "not late" embed alike but need different answers
+                    if entry is not None and negations(entry["text"]) != negations(normalized):
+                        entry = None
+            if entry is None:
+                self.misses += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if tier == "exact":
+                self.exact_hits += 1
+            else:
+                self.semantic_hits += 1
+            self.seconds_saved += entry["seconds"]
+            return entry["value"], tier
+
+    def store(self, text, value, prompt="", config=None, seconds=0.0):
+        """Cache `value` as the response to `text`; `seconds` is what computing it cost."""
+        namespace = _digest(prompt, config)
+        normalized = normalize_text(text)
+        key = _digest(namespace, normalized)
+        entry = {"namespace": namespace, "text": normalized, "value": value,
+                 "created": time.time(), "seconds": seconds}
+        vector = self.embedder.embed(normalized) if self.embedder is not None else None
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            if vector is not None:
+                self._indexes.setdefault(namespace, _VectorIndex()).add(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, namespace, normalized, json.dumps(value), entry["created"], seconds,
+                     self.embedder.name if vector is not None else None,
+                     vector.tobytes() if vector is not None else None)
+                )
+            self._evict()
+
+    def get_or_compute(self, text, compute, prompt="", config=None):
+        """Return the cached response for `text`, or call `compute()` and cache its result."""
+        value, _ = self.lookup(text, prompt, config)
+        if value is not None:
+            return value
+        start = time.perf_counter()
+        value = compute()
+        if value is not None:
+            self.store(text, value, prompt, config, time.perf_counter() - start)
+        return value
+
+    def cached_stream(self, text, stream, prompt="", config=None):
+        """Yield a cached response as one chunk, or pass `stream()` through and cache the joined text."""
+        value, _ = self.lookup(text, prompt, config)
+        if value is not None:
+            yield value
+            return
+        start = time.perf_counter()
+        chunks = []
+        for chunk in stream():
+            chunks.append(chunk)
+            yield chunk
+        if chunks:
+            self.store(text, "".join(chunks), prompt, config, time.perf_counter() - start)
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and time.time() - entry["created"] > self.ttl:
+            self._drop(key)
+            return None
+        return entry
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        index = self._indexes.get(entry["namespace"])
+        if index is not None:
+            index.remove(key)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def stats(self):
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+            "seconds_saved": self.seconds_saved,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path=None, **options):
+    """Return the shared cache for `path`.
+
+    RESPONSE_CACHE_EMBEDDER (hashing or minilm) turns on the similarity tier.
+    """
+    path = path or DEFAULT_PATH
+    options.setdefault("embedder", os.environ.get("RESPONSE_CACHE_EMBEDDER") or None)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path, **options)
+        return _caches[path]
+
+
+COMPLAINTS = [
+    "my delivery is late again and nobody told me why",
+    "i was charged twice on my last bill",
+    "the device keeps shutting down after an hour of use",
+    "i want a refund for the broken product",
+    "your support line kept me on hold for forty minutes",
+]
+
+# The same complaints with their meaning flipped; these must never be served another's analysis
+NEGATED = [
+    "my delivery is not late again and nobody told me why",
+    "i was not charged twice on my last bill",
+    "the device never shuts down after an hour of use",
+    "i don't want a refund for the broken product",
+    "your support line did not keep me on hold for forty minutes",
+]
+
+PREFIXES = ["", "hi, ", "hello, ", "um, ", "so, "]
+SUFFIXES = ["", ".", "!", " please help", " this is frustrating"]
+
+
+def benchmark(calls=500, llm_seconds=0.8, embedder="hashing"):
+    """Replay a skewed stream of repeated complaints against a simulated LLM call.
+
+    Afterwards, negated versions of the complaints are looked up; none of
+    them may be answered from the cache.
+    """
+    rng = random.Random(0)
+    weights = [0.4, 0.25, 0.15, 0.1, 0.1]
+    transcripts = []
+    for i in range(calls):
+        if rng.random() < 0.1:
+            # Long tail of one-off complaints
+            transcripts.append(f"unusual problem number {i} with order {rng.randint(1000, 9999)}")
+        else:
+            complaint = rng.choices(COMPLAINTS, weights)[0]
+            transcripts.append(rng.choice(PREFIXES) + complaint + rng.choice(SUFFIXES))
+
+    def fake_llm():
+        # Stand-in for a Gemini round trip; cost is counted, not slept
+        return {"sentiment": "Negative", "seconds": llm_seconds}
+
+    for tier_embedder in [None, embedder]:
+        cache = ResponseCache(path=None, embedder=tier_embedder)
+        start = time.perf_counter()
+        llm_calls = 0
+        for text in transcripts:
+            value, _ = cache.lookup(text, "analysis prompt", {"model": "gemini"})
+            if value is None:
+                llm_calls += 1
+                cache.store(text, fake_llm(), "analysis prompt", {"model": "gemini"}, llm_seconds)
+        overhead = time.perf_counter() - start
+        stats = cache.stats()
+        uncached = calls * llm_seconds
+        cached = llm_calls * llm_seconds + overhead
+        name = f"exact + {tier_embedder} similarity" if tier_embedder else "exact only"
+        print(f"{name:>28}: hit rate {stats['hit_rate']:.0%} "
+              f"({stats['exact_hits']} exact, {stats['semantic_hits']} similar), "
+              f"{llm_calls}/{calls} LLM calls, simulated time {uncached:.0f}s -> {cached:.1f}s "
+              f"({uncached / cached:.1f}x), cache overhead {overhead / calls * 1000:.2f} ms/lookup")
+        wrong = sum(cache.lookup(text, "analysis prompt", {"model": "gemini"})[0] is not None for text in NEGATED)
+        print(f"{'':>28}  negated complaints served a cached analysis: {wrong}/{len(NEGATED)}")
+
+
+if __name__ == "__main__":
+    # Usage: python response_cache.py [calls] [llm_seconds] [embedder]
+    benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.8,
+        sys.argv[3] if len(sys.argv) > 3 else "hashing",
+    )
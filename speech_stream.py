@@ -0,0 +1,113 @@
+import re
+import time
+import queue
+import threading
+
+# A sentence ends at ., ! or ? (optionally followed by quotes/brackets) and whitespace
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+')
+
+_DONE = object()
+
+
+class StreamTimer:
+    """Measures time-to-first-token and time-to-first-audio for one response."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.first_audio = None
+        self.end = None
+
+    def mark_first_token(self):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def mark_first_audio(self):
+        if self.first_audio is None:
+            self.first_audio = time.perf_counter()
+
+    def finish(self):
+        self.end = time.perf_counter()
+
+    def report(self):
+        """Return the measured latencies in seconds (None if not reached)."""
+        def since_start(t):
+            return None if t is None else t - self.start
+        return {
+            "time_to_first_token": since_start(self.first_token),
+            "time_to_first_audio": since_start(self.first_audio),
+            "total": since_start(self.end),
+        }
+
+    def summary(self):
+        parts = []
+        for name, value in self.report().items():
+            parts.append(f"{name}={value:.2f}s" if value is not None else f"{name}=n/a")
+        return ", ".join(parts)
+
+
+def split_sentences(chunks, timer=None):
+    """Turn a stream of text chunks into a stream of complete sentences.
+
+    Sentences are yielded as soon as their terminating punctuation and the
+    following whitespace have arrived; any trailing text is yielded at the end.
+    """
+    buffer = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if timer is not None:
+            timer.mark_first_token()
+        buffer += chunk
+        while True:
+            match = SENTENCE_END.search(buffer)
+            if not match:
+                break
+            sentence = buffer[:match.end()].strip()
+            buffer = buffer[match.end():]
+            if sentence:
+                yield sentence
+    if buffer.strip():
+        yield buffer.strip()
+
+
+def stream_to_speech(chunks, speak, on_sentence=None, timer=None):
+    """Speak a streamed LLM response sentence by sentence.
+
+    Tokens are read on a background thread so generation keeps going while
+    earlier sentences are being spoken. `on_sentence(sentence, text_so_far)` is
+    called before each sentence is spoken (e.g. to update a UI placeholder).
+    Returns the full response text.
+    """
+    timer = timer or StreamTimer()
+    sentences = queue.Queue()
+
+    def produce():
+        try:
+            for sentence in split_sentences(chunks, timer):
+                sentences.put(sentence)
+        except Exception as e:
+            sentences.put(e)
+        finally:
+            sentences.put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+
+    spoken = []
+    error = None
+    while True:
+        sentence = sentences.get()
+        if sentence is _DONE:
+            break
+        if isinstance(sentence, Exception):
+            error = sentence
+            continue
+        spoken.append(sentence)
+        if on_sentence is not None:
+            on_sentence(sentence, " ".join(spoken))
+        timer.mark_first_audio()
+        speak(sentence)
+    timer.finish()
+    if error is not None:
+        print(f"Error while streaming response: {error}")
+    return " ".join(spoken)
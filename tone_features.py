@@ -0,0 +1,217 @@
+import io
+import sys
+import time
+import wave
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Pitch search range for speech (Hz)
+MIN_PITCH = 60
+MAX_PITCH = 400
+
+# Speech threshold bounds (frame RMS, full scale = 1.0). The threshold follows
+# the quietest frames, but never drops below SPEECH_RMS_MIN and never rises
+# above SPEECH_RMS_MAX, so a loud clip without pauses still counts as speech.
+SPEECH_RMS_MIN = 0.01
+SPEECH_RMS_MAX = 0.05
+
+
+def frame_signal(samples, frame_length, hop_length):
+    """Split a 1-D signal into overlapping frames (a strided view, no copy)."""
+    if len(samples) < frame_length:
+        samples = np.pad(samples, (0, frame_length - len(samples)))
+    return sliding_window_view(samples, frame_length)[::hop_length]
+
+
+def frame_pitch(frames, sample_rate):
+    """Estimate the pitch of every frame by FFT autocorrelation.
+
+    Returns (pitch_hz, voicing) where voicing is the normalised autocorrelation
+    peak in [0, 1].
+    """
+    frame_length = frames.shape[1]
+    centred = frames - frames.mean(axis=1, keepdims=True)
+    windowed = centred * np.hanning(frame_length)
+    spectrum = np.fft.rfft(windowed, n=2 * frame_length, axis=1)
+    autocorr = np.fft.irfft(np.abs(spectrum) ** 2, axis=1)[:, :frame_length]
+
+    min_lag = max(1, int(sample_rate / MAX_PITCH))
+    max_lag = min(frame_length - 1, int(sample_rate / MIN_PITCH))
+    search = autocorr[:, min_lag:max_lag]
+    best = np.argmax(search, axis=1)
+    peak = search[np.arange(len(search)), best]
+    energy = autocorr[:, 0]
+    voicing = np.divide(peak, energy, out=np.zeros_like(peak), where=energy > 0)
+    pitch = sample_rate / (best + min_lag)
+    return pitch, np.clip(voicing, 0, 1)
+
+
+def extract_features(samples, sample_rate, frame_ms=25, hop_ms=10):
+    """Compute per-frame acoustic features for a 16-bit mono signal.
+
+    `samples` is an int16 array (or a PcmBuffer). Everything is computed in
+    float64, so loud int16 input can't overflow. Returns a dict of per-frame
+    arrays ("rms", "zcr", "pitch", "voiced", "speech") plus summary values.
+    """
+    if hasattr(samples, "samples"):
+        sample_rate = samples.sample_rate
+        samples = samples.mono().samples
+    signal = np.asarray(samples, dtype=np.float64) / 32768.0
+
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    hop_length = max(1, int(sample_rate * hop_ms / 1000))
+    frames = frame_signal(signal, frame_length, hop_length)
+
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+    # Speech frames: clearly above the quietest part of the clip, or loud in absolute terms
+    noise_floor = np.percentile(rms, 10)
+    speech = rms > max(min(noise_floor * 3, SPEECH_RMS_MAX), SPEECH_RMS_MIN)
+
+    pitch, voicing = frame_pitch(frames, sample_rate)
+    voiced = speech & (voicing > 0.3)
+    pitch = np.where(voiced, pitch, 0.0)
+
+    features = {
+        "rms": rms,
+        "zcr": zcr,
+        "pitch": pitch,
+        "voiced": voiced,
+        "speech": speech,
+        "frame_rate": sample_rate / hop_length,
+    }
+    features.update(summarize_features(features))
+    return features
+
+
+def speaking_rate(rms, speech, frame_rate):
+    """Approximate syllables per second (pauses included) from peaks in the energy envelope."""
+    if not speech.any() or len(rms) < 3:
+        return 0.0
+    # Smooth over ~100 ms, then count local maxima that sit in speech frames
+    width = max(1, int(frame_rate * 0.1))
+    envelope = np.convolve(rms, np.ones(width) / width, mode="same")
+    peaks = (envelope[1:-1] > envelope[:-2]) & (envelope[1:-1] >= envelope[2:]) & speech[1:-1]
+    # Ignore peaks closer than ~120 ms to the previous one
+    peak_frames = np.flatnonzero(peaks)
+    if len(peak_frames) > 1:
+        min_gap = frame_rate * 0.12
+        keep = np.concatenate(([True], np.diff(peak_frames) >= min_gap))
+        peak_frames = peak_frames[keep]
+    return len(peak_frames) / (len(rms) / frame_rate)
+
+
+def summarize_features(features):
+    """Reduce per-frame features to clip-level statistics."""
+    rms, speech, pitch = features["rms"], features["speech"], features["pitch"]
+    voiced_pitch = pitch[pitch > 0]
+    speech_rms = rms[speech]
+    return {
+        "mean_rms": float(speech_rms.mean()) if len(speech_rms) else 0.0,
+        "rms_std": float(speech_rms.std()) if len(speech_rms) else 0.0,
+        "mean_zcr": float(features["zcr"][speech].mean()) if speech.any() else 0.0,
+        "pitch_mean": float(voiced_pitch.mean()) if len(voiced_pitch) else 0.0,
+        "pitch_std": float(voiced_pitch.std()) if len(voiced_pitch) else 0.0,
+        "speaking_rate": float(speaking_rate(rms, speech, features["frame_rate"])),
+        "pause_ratio": float(1.0 - speech.mean()) if len(speech) else 1.0,
+    }
+
+
+def classify_tone(summary):
+    """Map clip-level features to "Excited", "Calm" or "Neutral"."""
+    if summary["mean_rms"] == 0.0:
+        return "Calm"
+    excited_votes = sum([
+        summary["mean_rms"] > 0.15,
+        summary["pitch_mean"] > 220 or summary["pitch_std"] > 40,
+        summary["speaking_rate"] > 5.0,
+        summary["pause_ratio"] < 0.15,
+    ])
+    calm_votes = sum([
+        summary["mean_rms"] < 0.05,
+        0 < summary["pitch_std"] < 20,
+        summary["speaking_rate"] < 3.0,
+        summary["pause_ratio"] > 0.4,
+    ])
+    if excited_votes >= 2 and excited_votes > calm_votes:
+        return "Excited"
+    if calm_votes >= 2 and calm_votes > excited_votes:
+        return "Calm"
+    return "Neutral"
+
+
+def analyze_tone_features(samples, sample_rate=None):
+    """Return (tone_label, summary) for an int16 signal or PcmBuffer."""
+    features = extract_features(samples, sample_rate)
+    summary = {key: value for key, value in features.items() if not isinstance(value, np.ndarray)}
+    return classify_tone(summary), summary
+
+
+def synthetic_speech(seconds, sample_rate, pitch, loudness, syllables_per_second, seed=0):
+    """Generate a voiced, syllable-modulated test signal as int16 samples."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    vibrato = pitch * (1 + 0.05 * np.sin(2 * np.pi * 3 * t))
+    phase = 2 * np.pi * np.cumsum(vibrato) / sample_rate
+    voice = np.sin(phase) + 0.5 * np.sin(2 * phase) + 0.25 * np.sin(3 * phase)
+    envelope = np.sin(np.pi * syllables_per_second * t) ** 2
+    noise = rng.normal(0, 0.01, len(t))
+    signal = loudness * voice / 1.75 * envelope + noise
+    return np.clip(signal * 32767, -32768, 32767).astype(np.int16)
+
+
+def check_loud_continuous(sample_rate=16000):
+    """Check that a loud signal without pauses is analysed as speech, not silence."""
+    t = np.arange(2 * sample_rate) / sample_rate
+    tone = (0.8 * 32767 * np.sin(2 * np.pi * 250 * t)).astype(np.int16)
+    label, summary = analyze_tone_features(tone, sample_rate)
+    assert summary["mean_rms"] > 0.5, summary
+    assert summary["pause_ratio"] < 0.05, summary
+    assert label != "Calm", label
+    print("Loud continuous input: OK")
+
+
+def benchmark(count=50, seconds=5.0, sample_rate=16000):
+    """Time feature extraction over a corpus of synthetic WAV files."""
+    corpus = []
+    for i in range(count):
+        samples = synthetic_speech(
+            seconds, sample_rate,
+            pitch=100 + (i * 37) % 200,
+            loudness=0.05 + (i % 5) * 0.2,
+            syllables_per_second=2 + i % 5,
+            seed=i,
+        )
+        wav_bytes = io.BytesIO()
+        with wave.open(wav_bytes, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(samples.tobytes())
+        corpus.append(wav_bytes.getvalue())
+
+    labels = {}
+    start = time.perf_counter()
+    for wav_data in corpus:
+        with wave.open(io.BytesIO(wav_data), "rb") as wav_file:
+            samples = np.frombuffer(wav_file.readframes(-1), dtype=np.int16)
+            rate = wav_file.getframerate()
+        tone, _ = analyze_tone_features(samples, rate)
+        labels[tone] = labels.get(tone, 0) + 1
+    elapsed = time.perf_counter() - start
+
+    audio_seconds = count * seconds
+    print(f"Analyzed {count} clips ({audio_seconds:.0f}s of audio) in {elapsed:.2f}s "
+          f"-> {audio_seconds / elapsed:.0f}x faster than real time")
+    print(f"Tone labels: {labels}")
+
+
+if __name__ == "__main__":
+    # Usage: python tone_features.py [clips] [seconds_per_clip]
+    check_loud_continuous()
+    benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 5.0,
+    )
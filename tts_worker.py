@@ -0,0 +1,162 @@
+import sys
+import time
+import queue
+import threading
+import pyttsx3
+
+_STOP = object()
+
+
+class Utterance:
+    """A queued piece of text; `wait()` blocks until it was spoken or cancelled."""
+
+    def __init__(self, text):
+        self.text = text
+        self.cancelled = False
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+
+class TtsWorker:
+    """Long-lived text-to-speech worker.
+
+    A single thread owns one pyttsx3 engine for the life of the process and
+    speaks utterances from a queue in order, so callers never pay for
+    `pyttsx3.init()` and never race on the engine from several threads.
+    """
+
+    def __init__(self, rate=None, volume=None):
+        self._queue = queue.Queue()
+        self._current = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._engine = None
+        self._rate = rate
+        self._volume = volume
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            # pyttsx3 could not start (e.g. no espeak driver); fail instead of hanging
+            raise self._error
+
+    def say(self, text):
+        """Queue `text` to be spoken and return its Utterance without waiting."""
+        utterance = Utterance(text)
+        self._queue.put(utterance)
+        return utterance
+
+    def speak(self, text, timeout=None):
+        """Speak `text` and block until it has been spoken (or cancelled)."""
+        utterance = self.say(text)
+        utterance.wait(timeout)
+        return utterance
+
+    def cancel(self):
+        """Drop everything queued and stop the utterance currently being spoken."""
+        while True:
+            try:
+                utterance = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if utterance is _STOP:
+                self._queue.put(_STOP)
+                break
+            utterance.cancelled = True
+            utterance._done.set()
+        with self._lock:
+            current = self._current
+        if current is not None:
+            current.cancelled = True
+            self._engine.stop()
+
+    def barge_in(self, text=None):
+        """Interrupt whatever is being said, optionally replacing it with `text`."""
+        self.cancel()
+        if text:
+            return self.say(text)
+        return None
+
+    def close(self):
+        """Finish the queued utterances and stop the worker thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        # The engine must be created and driven on the thread that uses it
+        try:
+            self._engine = pyttsx3.init()
+            if self._rate is not None:
+                self._engine.setProperty("rate", self._rate)
+            if self._volume is not None:
+                self._engine.setProperty("volume", self._volume)
+        except Exception as e:
+            self._error = e
+            return
+        finally:
+            self._ready.set()
+        while True:
+            utterance = self._queue.get()
+            if utterance is _STOP:
+                return
+            with self._lock:
+                self._current = utterance
+            try:
+                if not utterance.cancelled:
+                    self._engine.say(utterance.text)
+                    self._engine.runAndWait()
+            except Exception as e:
+                print(f"Error during text-to-speech: {e}")
+            finally:
+                with self._lock:
+                    self._current = None
+                utterance._done.set()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_tts_worker():
+    """Return the process-wide TTS worker, starting it on first use."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = TtsWorker()
+        return _worker
+
+
+def benchmark(count=10, text="ok"):
+    """Compare per-utterance overhead of pyttsx3.init() per call against the worker."""
+    start = time.perf_counter()
+    for _ in range(count):
+        engine = pyttsx3.init()
+        engine.setProperty("volume", 0)
+        engine.say(text)
+        engine.runAndWait()
+        del engine
+    per_call_init = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    worker = TtsWorker(volume=0)
+    startup = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        worker.speak(text)
+    persistent = (time.perf_counter() - start) / count
+    worker.close()
+
+    print(f"init per utterance:  {per_call_init * 1000:.1f} ms/utterance")
+    print(f"persistent worker:   {persistent * 1000:.1f} ms/utterance (one-time startup {startup * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    # Usage: python tts_worker.py [utterances]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,286 @@
+import os
+import sys
+import time
+from collections import deque
+import numpy as np
+import speech_recognition as sr
+from audio_buffer import PcmBuffer
+
+# Endpointer states
+WAITING = "waiting"
+SPEECH = "speech"
+DONE = "done"
+TIMEOUT = "timeout"
+
+
+class EnergyVad:
+    """Frame-level speech detector comparing each frame's RMS with the background.
+
+    The noise floor is an exponential average over frames judged unvoiced, so
+    it follows the room while the detector waits for speech. A frame is voiced
+    when its RMS is at least `ratio` times the floor and above `min_energy`.
+    """
+
+    name = "energy"
+
+    def __init__(self, ratio=3.0, min_energy=150.0, adapt=0.05):
+        self.ratio = ratio
+        self.min_energy = min_energy
+        self.adapt = adapt
+        self.noise_floor = None
+
+    @property
+    def threshold(self):
+        return max(self.min_energy, self.ratio * (self.noise_floor or 0.0))
+
+    def calibrate(self, samples):
+        """Set the noise floor from a stretch of background audio (int16 samples)."""
+        samples = np.asarray(samples, dtype=np.float32)
+        if len(samples):
+            self.noise_floor = float(np.sqrt(np.mean(samples ** 2)))
+
+    def is_speech(self, frame, sample_rate):
+        rms = float(np.sqrt(np.mean(frame.astype(np.float32) ** 2)))
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        voiced = rms >= self.threshold
+        if not voiced:
+            self.noise_floor += self.adapt * (rms - self.noise_floor)
+        return voiced
+
+
+class WebRtcVad:
+    """WebRTC's GMM speech detector (`pip install webrtcvad`).
+
+    Works on 10/20/30 ms frames at 8, 16, 32 or 48 kHz; other rates are
+    resampled to 16 kHz. `aggressiveness` runs from 0 (keeps most audio) to 3.
+    """
+
+    name = "webrtc"
+    RATES = (8000, 16000, 32000, 48000)
+
+    def __init__(self, aggressiveness=2):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+
+    def calibrate(self, samples):
+        pass
+
+    def is_speech(self, frame, sample_rate):
+        if sample_rate not in self.RATES:
+            # Round, don't truncate: webrtcvad only accepts exact 10/20/30 ms frames
+            target = 16 * round(len(frame) * 1000 / sample_rate)
+            frame = np.interp(np.linspace(0, len(frame) - 1, target), np.arange(len(frame)), frame).astype(np.int16)
+            sample_rate = 16000
+        return self.vad.is_speech(frame.tobytes(), sample_rate)
+
+
+VADS = {
+    "energy": EnergyVad,
+    "webrtc": WebRtcVad,
+}
+
+
+def get_vad(name=None, **options):
+    """Return a new detector; VAD_BACKEND picks it, falling back to energy if webrtcvad is missing."""
+    name = name or os.environ.get("VAD_BACKEND", "webrtc")
+    try:
+        return VADS[name](**options)
+    except ImportError:
+        return EnergyVad()
+
+
+class Endpointer:
+    """Cuts one utterance out of a stream of 16-bit mono PCM chunks.
+
+    Chunks of any size are split into `frame_ms` frames and classified by
+    the VAD. Capture starts at speech onset (`onset` seconds of consecutive
+    voiced frames) and ends after `trailing_silence` seconds of silence or
+    `max_speech` seconds of speech. The segment keeps `padding` seconds of
+    audio on either side of the voiced frames; everything else is dropped.
+    If no speech starts within `no_speech_timeout` seconds, it times out
+    (None waits forever, and None for `max_speech` removes the limit).
+    Times are measured in audio, so replayed audio behaves like live input.
+    """
+
+    def __init__(self, sample_rate, vad=None, trailing_silence=0.7, no_speech_timeout=5.0,
+                 max_speech=15.0, onset=0.09, padding=0.15, frame_ms=30):
+        self.sample_rate = sample_rate
+        self.vad = vad or get_vad()
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_seconds = self.frame_samples / sample_rate
+        self.trailing_silence = trailing_silence
+        self.no_speech_timeout = no_speech_timeout
+        self.max_speech = max_speech
+        self.onset_frames = max(1, round(onset / self.frame_seconds))
+        self.padding_frames = round(padding / self.frame_seconds)
+        self.reset()
+
+    def reset(self):
+        """Forget the previous utterance (the VAD keeps its noise estimate)."""
+        self.state = WAITING
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._recent = deque(maxlen=self.onset_frames + self.padding_frames)
+        self._frames = []
+        self._first_frame = 0
+        self._voiced_run = 0
+        self._silent_run = 0
+        self._last_voiced = 0
+        self.frames_read = 0
+        self.speech_start = None
+        self.speech_end = None
+
+    def calibrate(self, samples):
+        """Learn the background level from int16 samples or raw PCM bytes."""
+        if isinstance(samples, (bytes, bytearray, memoryview)):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        self.vad.calibrate(samples)
+
+    def push(self, chunk):
+        """Add raw PCM bytes (or int16 samples); returns the state after them."""
+        if self.state in (DONE, TIMEOUT):
+            return self.state
+        samples = np.frombuffer(chunk, dtype=np.int16) if isinstance(chunk, (bytes, bytearray, memoryview)) else chunk
+        samples = np.concatenate([self._remainder, samples.reshape(-1)])
+        usable = len(samples) - len(samples) % self.frame_samples
+        self._remainder = samples[usable:]
+        for frame in samples[:usable].reshape(-1, self.frame_samples):
+            self._push_frame(frame)
+            if self.state in (DONE, TIMEOUT):
+                break
+        return self.state
+
+    def _push_frame(self, frame):
+        self.frames_read += 1
+        voiced = self.vad.is_speech(frame, self.sample_rate)
+        if self.state == WAITING:
+            self._recent.append(frame)
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= self.onset_frames:
+                self.state = SPEECH
+                self._frames = list(self._recent)
+                self._first_frame = self.frames_read - len(self._frames)
+                self._last_voiced = len(self._frames)
+                self.speech_start = (self.frames_read - self.onset_frames) * self.frame_seconds
+            elif self.no_speech_timeout is not None and self.frames_read * self.frame_seconds >= self.no_speech_timeout:
+                self.state = TIMEOUT
+            return
+        self._frames.append(frame)
+        if voiced:
+            self._silent_run = 0
+            self._last_voiced = len(self._frames)
+        else:
+            self._silent_run += 1
+        speech_seconds = (len(self._frames) - len(self._recent)) * self.frame_seconds
+        if (self._silent_run * self.frame_seconds >= self.trailing_silence
+                or self.max_speech is not None and speech_seconds >= self.max_speech):
+            self.state = DONE
+            self.speech_end = (self._first_frame + self._last_voiced) * self.frame_seconds
+            # Trim the trailing silence, keeping the padding
+            del self._frames[self._last_voiced + self.padding_frames:]
+
+    def segment(self):
+        """The captured utterance as a PcmBuffer (None before speech ended)."""
+        if self.state != DONE:
+            return None
+        return PcmBuffer.from_ndarray(np.concatenate(self._frames), self.sample_rate)
+
+    def stats(self):
+        """Seconds of audio read, kept, and waited before speech started."""
+        kept = sum(len(frame) for frame in self._frames) / self.sample_rate if self.state == DONE else 0.0
+        return {
+            "read": self.frames_read * self.frame_seconds,
+            "kept": kept,
+            "waited": self.speech_start if self.speech_start is not None else self.frames_read * self.frame_seconds,
+        }
+
+
+def listen_for_speech(source, endpointer=None, on_chunk=None, calibration=0.0, **options):
+    """Record one utterance from an open sr.Microphone, trimmed to the voiced segment.
+
+    Drop-in replacement for `recognizer.listen(source, ...)`: returns AudioData,
+    and raises sr.WaitTimeoutError if nobody starts speaking in time. With
+    `calibration`, that many seconds of background noise are measured first
+    (replacing `adjust_for_ambient_noise`). `options` configure a new
+    Endpointer when none is given.
+    """
+    endpointer = endpointer or Endpointer(source.SAMPLE_RATE, **options)
+    endpointer.reset()
+    if calibration:
+        endpointer.calibrate(source.stream.read(int(calibration * source.SAMPLE_RATE)))
+    while True:
+        data = source.stream.read(source.CHUNK)
+        if on_chunk is not None:
+            on_chunk(data)
+        state = endpointer.push(data)
+        if state == TIMEOUT:
+            raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+        if state == DONE:
+            return endpointer.segment().to_audio_data()
+
+
+def record_speech(sample_rate=16000, device=None, endpointer=None, **options):
+    """Record one utterance with sounddevice, trimmed to the voiced segment.
+
+    Returns a PcmBuffer, or None if nobody started speaking in time.
+    """
+    import sounddevice as sd
+
+    endpointer = endpointer or Endpointer(sample_rate, **options)
+    endpointer.reset()
+    with sd.InputStream(samplerate=sample_rate, channels=1, dtype="int16", device=device,
+                        blocksize=endpointer.frame_samples) as stream:
+        while True:
+            data, _ = stream.read(endpointer.frame_samples)
+            state = endpointer.push(data[:, 0])
+            if state == TIMEOUT:
+                return None
+            if state == DONE:
+                return endpointer.segment()
+
+
+def benchmark(sample_rate=16000, fixed_seconds=5.0, lead=0.8, vad_name="energy"):
+    """Compare fixed-length recording with VAD endpointing on synthetic utterances."""
+    from tone_features import synthetic_speech
+
+    rng = np.random.default_rng(0)
+
+    def silence(seconds):
+        return rng.normal(0, 60, int(seconds * sample_rate)).astype(np.int16)
+
+    print(f"{'speech':>7} | {'fixed: wait':>11} {'sent':>6} {'cut':>5} | "
+          f"{'vad: wait':>9} {'sent':>6} {'onset err':>9} {'end err':>8}")
+    totals = {"fixed_wait": 0.0, "fixed_sent": 0.0, "vad_wait": 0.0, "vad_sent": 0.0, "vad_cpu": 0.0}
+    for seconds in [1.0, 2.0, 3.0, 5.0, 8.0]:
+        speech = synthetic_speech(seconds, sample_rate, pitch=140, loudness=0.3, syllables_per_second=4, seed=int(seconds))
+        audio = np.concatenate([silence(lead), speech, silence(3.0)])
+
+        # Fixed recording: always `fixed_seconds`, speech past the end is lost
+        cut = max(0.0, lead + seconds - fixed_seconds)
+
+        endpointer = Endpointer(sample_rate, vad=VADS[vad_name]())
+        endpointer.calibrate(silence(0.5))
+        start = time.perf_counter()
+        for offset in range(0, len(audio), 1024):
+            if endpointer.push(audio[offset:offset + 1024]) in (DONE, TIMEOUT):
+                break
+        totals["vad_cpu"] += time.perf_counter() - start
+        stats = endpointer.stats()
+        print(f"{seconds:>6.1f}s | {fixed_seconds:>10.1f}s {fixed_seconds:>5.1f}s {cut:>4.1f}s | "
+              f"{stats['read']:>8.2f}s {stats['kept']:>5.2f}s "
+              f"{endpointer.speech_start - lead:>+8.2f}s {endpointer.speech_end - (lead + seconds):>+7.2f}s")
+        totals["fixed_wait"] += fixed_seconds
+        totals["fixed_sent"] += fixed_seconds
+        totals["vad_wait"] += stats["read"]
+        totals["vad_sent"] += stats["kept"]
+    print(f"Total wait {totals['fixed_wait']:.1f}s -> {totals['vad_wait']:.1f}s, "
+          f"audio sent to ASR {totals['fixed_sent']:.1f}s -> {totals['vad_sent']:.1f}s "
+          f"(VAD cost {totals['vad_cpu'] / totals['vad_wait'] * 1000:.2f} ms per second of audio)")
+
+
+if __name__ == "__main__":
+    # Usage: python vad.py [sample_rate] [vad: energy|webrtc]
+    benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 16000,
+        vad_name=sys.argv[2] if len(sys.argv) > 2 else "energy",
+    )